@@ -0,0 +1,380 @@
+__author__ = 'davis'
+"""
+asyncio Engine, Connection and Result.
+
+Every example calls engine.execute() / conn.execute() and blocks until
+the database answers.  In an asyncio program that means wrapping each
+call in run_in_executor().  AsyncEngine does that wrapping once, behind
+an API shaped like the blocking one:
+
+    engine = AsyncEngine(create_engine("sqlite:///some.db"), pool_size=10)
+
+    async with engine.connect() as conn:
+        result = await conn.execute(select([user_table]))
+        async for row in result:
+            print(row['username'])
+
+    rows = await (await engine.execute(select([user_table]))).fetchall()
+
+Each pooled connection owns a thread, and everything done with that
+connection - connecting, executing, fetching, committing - runs on it.
+That's what DBAPI drivers that care about threads (pysqlite's
+check_same_thread) need, and it makes any DBAPI driver usable, SQLite
+included, as if it were an async one.
+
+The pool is asyncio-aware: engine.connect() waits without blocking the
+event loop while all ``pool_size`` connections are in use, and raises
+TimeoutError after ``timeout`` seconds.  A connection returned with a
+transaction that conn.begin() started and that is still open is
+rolled back first.
+
+Each of those connections is checked out of the Engine's own pool, from
+its own thread, and kept, so that pool has to be able to hand out
+``pool_size`` of them.  ``pool_size`` defaults to 5, or fewer if the
+Engine's pool can't give out that many, and a larger ``pool_size`` than
+it can raises ArgumentError: a QueuePool gives out its pool_size plus
+max_overflow, a StaticPool one connection.  create_engine("sqlite://")
+uses a SingletonThreadPool, which would give every thread its own empty
+database, so for an in-memory SQLite stand-in use a StaticPool - one
+connection, created on whichever thread asks first:
+
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import exc
+from sqlalchemy import pool
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_TIMEOUT = 30
+DEFAULT_BATCH_SIZE = 100
+
+
+class _AwaitableContext(object):
+    """Something to ``await`` or to use with ``async with``."""
+
+    def __init__(self, open_, close):
+        self._open = open_
+        self._close = close
+        self._value = None
+
+    def __await__(self):
+        return self._open().__await__()
+
+    async def __aenter__(self):
+        self._value = await self._open()
+        return self._value
+
+    async def __aexit__(self, type_, value, traceback):
+        await self._close(self._value, type_ is not None)
+
+
+class _Worker(object):
+    """A thread and the blocking Connection that lives on it."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(1)
+        self.connection = None
+
+    def run(self, fn, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(
+            self.executor, functools.partial(fn, *args))
+
+    def _connect(self):
+        self.connection = self.engine.connect()
+
+    async def connect(self):
+        if self.connection is None or self.connection.closed:
+            await self.run(self._connect)
+
+    def _close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    async def close(self):
+        await self.run(self._close)
+        self.executor.shutdown(wait=False)
+
+
+def _connection_limit(engine):
+    """How many connections ``engine``'s pool gives out at once, or None."""
+    sync_pool = engine.pool
+    if isinstance(sync_pool, pool.SingletonThreadPool):
+        if engine.url.database in (None, '', ':memory:'):
+            raise exc.ArgumentError(
+                "An in-memory SQLite database with SingletonThreadPool "
+                "is a different database on every thread; use "
+                "poolclass=StaticPool")
+        return sync_pool.size
+    if isinstance(sync_pool, (pool.StaticPool, pool.AssertionPool)):
+        return 1
+    if isinstance(sync_pool, pool.QueuePool) and \
+            sync_pool._max_overflow >= 0:
+        return sync_pool.size() + sync_pool._max_overflow
+    return None
+
+
+class AsyncEngine(object):
+    """An Engine whose connections are used from coroutines."""
+
+    def __init__(self, engine, pool_size=None, timeout=DEFAULT_TIMEOUT):
+        limit = _connection_limit(engine)
+        if pool_size is None:
+            pool_size = DEFAULT_POOL_SIZE
+            if limit is not None:
+                pool_size = min(pool_size, limit)
+        elif limit is not None and pool_size > limit:
+            raise exc.ArgumentError(
+                "pool_size=%d is more than the %d connections %s gives "
+                "out" % (pool_size, limit, type(engine.pool).__name__))
+        self.sync_engine = engine
+        self.dialect = engine.dialect
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = None
+        self._workers = []
+
+    def _queue(self):
+        # made on first use, so that it belongs to the running loop
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        return self._idle
+
+    async def _acquire(self):
+        idle = self._queue()
+        if not idle.empty():
+            worker = idle.get_nowait()
+        elif len(self._workers) < self.pool_size:
+            worker = _Worker(self.sync_engine)
+            self._workers.append(worker)
+        else:
+            worker = await asyncio.wait_for(idle.get(), self.timeout)
+        try:
+            await worker.connect()
+        except Exception:
+            self._workers.remove(worker)
+            await worker.close()
+            raise
+        return worker
+
+    def _release(self, worker):
+        self._queue().put_nowait(worker)
+
+    def connect(self):
+        """``await engine.connect()`` or ``async with engine.connect()``."""
+        async def open_():
+            return AsyncConnection(self, await self._acquire())
+
+        async def close(conn, failed):
+            await conn.close()
+        return _AwaitableContext(open_, close)
+
+    async def execute(self, statement, *multiparams, **params):
+        """Execute on a pooled connection; the rows are fetched up front."""
+        async with self.connect() as conn:
+            result = await conn.execute(statement, *multiparams, **params)
+            rows = await result.fetchall() if result.returns_rows else []
+            return BufferedAsyncResult(result, rows)
+
+    async def dispose(self):
+        """Close every pooled connection and its thread."""
+        workers, self._workers = self._workers, []
+        self._idle = None
+        for worker in workers:
+            await worker.close()
+
+    def status(self):
+        return "%d connections, %d idle" % (
+            len(self._workers),
+            self._idle.qsize() if self._idle is not None else 0)
+
+
+class AsyncConnection(object):
+    """A pooled Connection; every call runs on the connection's thread."""
+
+    def __init__(self, engine, worker):
+        self.engine = engine
+        self._worker = worker
+        self._transaction = None
+        self.sync_connection = worker.connection
+
+    @property
+    def closed(self):
+        return self._worker is None
+
+    def _run(self, fn, *args):
+        if self._worker is None:
+            raise ValueError("This AsyncConnection is closed")
+        return self._worker.run(fn, *args)
+
+    async def execute(self, statement, *multiparams, **params):
+        result = await self._run(functools.partial(
+            self.sync_connection.execute, statement, *multiparams, **params))
+        return AsyncResult(self, result)
+
+    async def scalar(self, statement, *multiparams, **params):
+        result = await self.execute(statement, *multiparams, **params)
+        return await result.scalar()
+
+    def begin(self):
+        """``await conn.begin()`` or ``async with conn.begin()``.
+
+        The ``async with`` form commits, or rolls back on an exception.
+        """
+        async def open_():
+            transaction = await self._run(self.sync_connection.begin)
+            self._transaction = AsyncTransaction(self, transaction)
+            return self._transaction
+
+        async def close(transaction, failed):
+            if failed:
+                await transaction.rollback()
+            else:
+                await transaction.commit()
+        return _AwaitableContext(open_, close)
+
+    async def close(self):
+        """Return the connection to the AsyncEngine's pool."""
+        if self._worker is None:
+            return
+        try:
+            if self._transaction is not None and \
+                    self._transaction.sync_transaction.is_active:
+                await self._transaction.rollback()
+        finally:
+            worker, self._worker = self._worker, None
+            self.engine._release(worker)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type_, value, traceback):
+        await self.close()
+
+
+class AsyncTransaction(object):
+
+    def __init__(self, connection, transaction):
+        self.connection = connection
+        self.sync_transaction = transaction
+
+    async def commit(self):
+        await self.connection._run(self.sync_transaction.commit)
+
+    async def rollback(self):
+        await self.connection._run(self.sync_transaction.rollback)
+
+
+class AsyncResult(object):
+    """A ResultProxy whose fetches run on the connection's thread.
+
+    ``async for`` fetches ``batch_size`` rows at a time.
+    """
+
+    batch_size = DEFAULT_BATCH_SIZE
+
+    def __init__(self, connection, result):
+        self.connection = connection
+        self.sync_result = result
+        self.returns_rows = result.returns_rows
+        self._buffer = []
+
+    @property
+    def rowcount(self):
+        return self.sync_result.rowcount
+
+    def keys(self):
+        return self.sync_result.keys()
+
+    @property
+    def inserted_primary_key(self):
+        return self.sync_result.inserted_primary_key
+
+    def _fetch(self, method, *args):
+        return self.connection._run(getattr(self.sync_result, method), *args)
+
+    async def fetchone(self):
+        if self._buffer:
+            return self._buffer.pop(0)
+        return await self._fetch('fetchone')
+
+    async def fetchmany(self, size=None):
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            size = (size or self.batch_size) - len(rows)
+            if size > 0:
+                rows.extend(await self._fetch('fetchmany', size))
+            return rows
+        return await self._fetch('fetchmany', size or self.batch_size)
+
+    async def fetchall(self):
+        rows, self._buffer = self._buffer, []
+        return rows + await self._fetch('fetchall')
+
+    async def first(self):
+        self._buffer = []
+        return await self._fetch('first')
+
+    async def scalar(self):
+        self._buffer = []
+        return await self._fetch('scalar')
+
+    async def close(self):
+        await self._fetch('close')
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._buffer:
+            self._buffer = await self._fetch('fetchmany', self.batch_size)
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.pop(0)
+
+
+class BufferedAsyncResult(object):
+    """Rows already fetched, for AsyncEngine.execute()."""
+
+    def __init__(self, result, rows):
+        self.returns_rows = result.returns_rows
+        self.rowcount = result.rowcount
+        self._keys = result.keys() if result.returns_rows else []
+        self._rows = rows
+
+    def keys(self):
+        return self._keys
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchmany(self, size=DEFAULT_BATCH_SIZE):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    async def first(self):
+        rows, self._rows = self._rows, []
+        return rows[0] if rows else None
+
+    async def scalar(self):
+        row = await self.first()
+        return row[0] if row is not None else None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._rows:
+            raise StopAsyncIteration
+        return self._rows.pop(0)
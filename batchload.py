@@ -0,0 +1,298 @@
+__author__ = 'davis'
+"""
+"Batch" lazy loading.
+
+    for user in session.query(User):
+        print(user, user.addresses)
+
+emits one SELECT for the users and then one per user for the addresses.
+With the batch strategy the first user.addresses access loads the
+addresses for every User that came back from the same query, up to
+batch_size parents per SELECT, with "WHERE address.user_id IN (...)".
+Later accesses find the collection already there.
+
+Either configure it on the relationship:
+
+    import batchload    # registers lazy="batch"
+
+    user = relationship("User",
+                        backref=backref("addresses", lazy="batch",
+                                        info={'batch_size': 500}))
+
+or turn it on per query:
+
+    session.query(User).options(batchload(User.addresses, batch_size=500))
+
+lazy="chunked" / chunkload() is the eager version of the same idea.
+It's selectinload() - as soon as the parent rows are loaded, the
+related rows are loaded with IN queries, without re-running the parent
+query (subqueryload) or multiplying parent rows (joinedload) - with
+chunk_size parent keys per IN instead of selectinload()'s fixed 500.
+
+    session.query(User).options(chunkload(User.addresses, chunk_size=500))
+    session.query(Address).options(chunkload(Address.user))
+
+Only simple single column foreign key relationships are batched,
+one-to-many and many-to-one, with any extra primaryjoin criteria on the
+related table (say Address.email.like('%gmail%')) added to the IN query.
+Anything else (secondary tables, composite keys, aliased targets,
+criteria on the parent's table, self-referential joins with extra
+criteria) lazy loads one parent at a time as usual.
+"""
+
+from sqlalchemy import sql
+from sqlalchemy.orm import attributes
+from sqlalchemy.orm import interfaces
+from sqlalchemy.orm import loading
+from sqlalchemy.orm import properties
+from sqlalchemy.orm import strategy_options
+from sqlalchemy.orm.state import InstanceState
+from sqlalchemy.orm.strategies import LazyLoader, SelectInLoader
+from sqlalchemy.orm.session import _state_session
+from sqlalchemy.sql import elements
+from sqlalchemy.sql import operators
+from sqlalchemy.sql import util as sql_util
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def batchload(attr, batch_size=None):
+    """Query option: batch lazy load ``attr`` for this query's results."""
+    loader = strategy_options._UnboundLoad().set_relationship_strategy(
+        attr, {"lazy": "batch"})
+    if batch_size is not None:
+        loader.local_opts["batch_size"] = batch_size
+    return loader
+
+
+def chunkload(attr, chunk_size=None):
+    """Query option: eager load ``attr`` with chunked IN queries."""
+    strategy = {"lazy": "chunked"}
+    if chunk_size is not None:
+        strategy["chunk_size"] = chunk_size
+        key = tuple(sorted(strategy.items()))
+        if key not in ChunkedInLoader._strategy_keys:
+            properties.RelationshipProperty.strategy_for(**strategy)(
+                ChunkedInLoader)
+    return strategy_options._UnboundLoad().set_relationship_strategy(
+        attr, strategy)
+
+
+def _extra_criteria(prop, local_col, remote_col):
+    """What prop.primaryjoin has besides ``local_col == remote_col``.
+
+    Returns None if that's all there is, the rest of the AND otherwise,
+    or False if the rest refers to the parent's table, which an IN
+    against the related table can't express.
+    """
+    join = prop.primaryjoin
+    if isinstance(join, elements.BooleanClauseList) and \
+            join.operator is operators.and_:
+        clauses = list(join.clauses)
+    else:
+        clauses = [join]
+
+    rest = []
+    pair = set([local_col, remote_col])
+    for clause in clauses:
+        if isinstance(clause, elements.BinaryExpression) and \
+                clause.operator is operators.eq and \
+                set([clause.left._deannotate(),
+                     clause.right._deannotate()]) == pair:
+            pair = None
+        else:
+            rest.append(clause)
+    if pair is not None:
+        return False
+    if not rest:
+        return None
+
+    parent_tables = set(prop.parent.tables)
+    if parent_tables.intersection(prop.mapper.tables):
+        # self-referential; the columns don't say which side they're on
+        return False
+    for clause in rest:
+        if parent_tables.intersection(
+                sql_util.find_tables(clause, check_columns=True)):
+            return False
+    return sql_util._deep_deannotate(sql.and_(*rest))
+
+
+@properties.RelationshipProperty.strategy_for(lazy="batch")
+class BatchLazyLoader(LazyLoader):
+    """LazyLoader that loads a whole result's worth of parents at once."""
+
+    __slots__ = ("_batch_columns",)
+
+    def _memoized_attr__batch_columns(self):
+        prop = self.parent_property
+        if prop.secondary is not None or self.is_aliased_class or \
+                prop.direction is interfaces.MANYTOMANY:
+            return None
+        pairs = prop.local_remote_pairs
+        if len(pairs) != 1:
+            return None
+        local_col, remote_col = pairs[0]
+        criteria = _extra_criteria(prop, local_col, remote_col)
+        if criteria is False:
+            return None
+        remote_key = self.mapper.get_property_by_column(remote_col).key
+        return local_col, remote_col, remote_key, criteria
+
+    def create_row_processor(
+        self, context, path, loadopt, mapper, result, adapter, populators
+    ):
+        super(BatchLazyLoader, self).create_row_processor(
+            context, path, loadopt, mapper, result, adapter, populators)
+        if self._batch_columns is None:
+            return
+
+        batch_size = self.parent_property.info.get(
+            'batch_size', DEFAULT_BATCH_SIZE)
+        if loadopt is not None:
+            batch_size = loadopt.local_opts.get('batch_size', batch_size)
+
+        # every parent of this result shares one batch
+        batch = []
+        set_callable = InstanceState._instance_level_callable_processor(
+            mapper.class_manager,
+            LoadBatchAttribute(self.key, self, batch, batch_size),
+            self.key)
+
+        def add_to_batch(state, dict_, row):
+            batch.append(state)
+            set_callable(state, dict_, row)
+
+        populators["new"].append((self.key, add_to_batch))
+
+    def _parent_value(self, state, passive):
+        local_col = self._batch_columns[0]
+        mapper = state.manager.mapper
+        if state.key is not None and local_col in mapper._pks_by_table.get(
+                local_col.table, ()):
+            # primary key values are always known from the identity key
+            return state.key[1][mapper.primary_key.index(local_col)]
+        return mapper._get_state_attr_by_column(
+            state, state.dict, local_col, passive=passive)
+
+    def _load_batch(self, state, passive, batch, batch_size):
+        session = _state_session(state)
+        if not passive & attributes.SQL_OK or session is None or \
+                state.key is None:
+            return self._load_for_state(state, passive)
+
+        value = self._parent_value(state, passive)
+        if value is None or value is attributes.PASSIVE_NO_RESULT:
+            return self._load_for_state(state, passive)
+
+        key = self.key
+        parents = {value: [state]}
+        count = 1
+        while batch and count < batch_size:
+            other = batch.pop()
+            if other is state or other.obj() is None or \
+                    key in other.dict or _state_session(other) is not session:
+                continue
+            other_value = self._parent_value(
+                other, attributes.PASSIVE_NO_FETCH)
+            if other_value is None or \
+                    other_value is attributes.PASSIVE_NO_RESULT:
+                continue
+            parents.setdefault(other_value, []).append(other)
+            count += 1
+
+        loaded = self._query_related(
+            session, list(parents), passive & attributes.NO_AUTOFLUSH)
+        self._populate(parents, loaded, skip=state)
+        return self._value(loaded.get(value, []))
+
+    def _query_related(self, session, values, no_autoflush=False):
+        """Map each parent value in ``values`` to its related objects."""
+        local_col, remote_col, remote_key, criteria = self._batch_columns
+        loaded = {}
+        if self.use_get:
+            # many-to-one against the primary key; whatever is in the
+            # identity map already doesn't need to be SELECTed again
+            missing = []
+            for value in values:
+                key = self.mapper.identity_key_from_primary_key([value])
+                obj = loading.get_from_identity(
+                    session, self.mapper, key, attributes.PASSIVE_NO_FETCH)
+                if obj is None or obj is attributes.PASSIVE_NO_RESULT or \
+                        obj is attributes.PASSIVE_CLASS_MISMATCH:
+                    missing.append(value)
+                else:
+                    loaded[value] = [obj]
+            values = missing
+        if not values:
+            return loaded
+
+        q = session.query(self.mapper).filter(remote_col.in_(values))
+        if criteria is not None:
+            q = q.filter(criteria)
+        if no_autoflush:
+            q = q.autoflush(False)
+        if self.parent_property.order_by:
+            q = q.order_by(*self.parent_property.order_by)
+        for obj in q:
+            loaded.setdefault(getattr(obj, remote_key), []).append(obj)
+        return loaded
+
+    def _value(self, objs):
+        if self.uselist:
+            return list(objs)
+        return objs[0] if objs else None
+
+    def _populate(self, parents, loaded, skip=None):
+        key = self.key
+        for parent_value, states in parents.items():
+            objs = loaded.get(parent_value, [])
+            for state in states:
+                if state is skip or key in state.dict:
+                    continue
+                state.get_impl(key).set_committed_value(
+                    state, state.dict, self._value(objs))
+
+
+@properties.RelationshipProperty.strategy_for(lazy="chunked")
+class ChunkedInLoader(SelectInLoader):
+    """selectinload() with a configurable chunk size.
+
+    SelectInLoader already loads the related rows for all parents of a
+    result with "WHERE address.user_id IN (...)", without re-running the
+    parent query (subqueryload) or repeating parent rows (joinedload),
+    but always 500 parent keys per statement.  Here the chunk size comes
+    from chunkload(), which registers a strategy key per size, or from
+    the relationship's info['chunk_size'].
+    """
+
+    __slots__ = ()
+
+    @property
+    def _chunksize(self):
+        chunk_size = dict(self.strategy_key).get('chunk_size')
+        if chunk_size is None:
+            chunk_size = self.parent_property.info.get(
+                'chunk_size', DEFAULT_BATCH_SIZE)
+        return chunk_size
+
+
+class LoadBatchAttribute(object):
+    """Per-instance loader callable carrying the shared batch."""
+
+    def __init__(self, key, initiating_strategy, batch, batch_size):
+        self.key = key
+        self.strategy_key = initiating_strategy.strategy_key
+        self.batch = batch
+        self.batch_size = batch_size
+
+    def __getstate__(self):
+        # the batch refers to other objects' states; don't pickle it
+        return {'key': self.key, 'strategy_key': self.strategy_key,
+                'batch': [], 'batch_size': self.batch_size}
+
+    def __call__(self, state, passive=attributes.PASSIVE_OFF):
+        prop = state.manager.mapper._props[self.key]
+        strategy = prop._strategies[self.strategy_key]
+        return strategy._load_batch(
+            state, passive, self.batch, self.batch_size)
@@ -0,0 +1,83 @@
+__author__ = 'davis'
+"""
+Queries per second through AsyncEngine with 1, 10 and 100 concurrent
+tasks.
+
+    python benchmark-async.py [queries] [pool_size] [latency_msec]
+
+SQLite answers in microseconds, so every query also calls a sleep()
+SQL function standing in for network latency; it sleeps on the
+connection's thread, not on the event loop.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, select, func
+
+from async_engine import AsyncEngine
+from employee import metadata, employee_table, populate
+
+QUERIES = 1000
+POOL_SIZE = 20
+LATENCY = 2.0
+
+
+def setup(path, latency):
+    engine = create_engine("sqlite:///%s" % path)
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function(
+            'sleep', 1, lambda msec: time.sleep(msec / 1000.0) or 0)
+    metadata.create_all(engine)
+    populate(engine, 1000)
+    return engine
+
+
+async def run(engine, tasks, queries, latency):
+    statement = select([employee_table.c.emp_name, func.sleep(latency)]).\
+        where(employee_table.c.emp_id == 500)
+
+    async def task(count):
+        for i in range(count):
+            async with engine.connect() as conn:
+                result = await conn.execute(statement)
+                async for row in result:
+                    row['emp_name']
+
+    start = time.time()
+    await asyncio.gather(*[task(queries // tasks) for i in range(tasks)])
+    elapsed = time.time() - start
+    print("%3d tasks: %d queries in %.2f sec, %.0f queries/sec (%s)" % (
+        tasks, queries // tasks * tasks, elapsed,
+        queries // tasks * tasks / elapsed, engine.status()))
+
+
+async def main_async(engine, queries, pool_size, latency):
+    engine = AsyncEngine(engine, pool_size=pool_size)
+    for tasks in (1, 10, 100):
+        await run(engine, tasks, queries, latency)
+    await engine.dispose()
+
+
+def main(argv):
+    queries = int(argv[1]) if len(argv) > 1 else QUERIES
+    pool_size = int(argv[2]) if len(argv) > 2 else POOL_SIZE
+    latency = float(argv[3]) if len(argv) > 3 else LATENCY
+    tmp = tempfile.mkdtemp()
+    try:
+        engine = setup(os.path.join(tmp, 'db'), latency)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(main_async(engine, queries, pool_size,
+                                           latency))
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
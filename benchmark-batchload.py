@@ -0,0 +1,49 @@
+__author__ = 'davis'
+"""
+Count queries and wall time for
+
+    for user in session.query(User):
+        user.addresses
+
+with plain lazy loading and with batchload().
+
+    python benchmark-batchload.py [users] [batch size]
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from batchload import batchload
+from query_stats import QueryStats
+from users import User, setup
+
+USERS = 10000
+ADDRESSES_PER_USER = 2
+BATCH_SIZE = 500
+
+
+def run(engine, label, options):
+    session = Session(bind=engine)
+    start = time.time()
+    total = 0
+    with QueryStats(engine) as stats:
+        for user in session.query(User).options(*options):
+            total += len(user.addresses)
+    elapsed = time.time() - start
+    session.close()
+    print("%-12s %6d addresses %6d queries %8.2f sec" % (
+        label, total, stats.count, elapsed))
+
+
+def main(argv):
+    users = int(argv[1]) if len(argv) > 1 else USERS
+    batch_size = int(argv[2]) if len(argv) > 2 else BATCH_SIZE
+    engine = setup(users, ADDRESSES_PER_USER)
+    run(engine, "lazy", [])
+    run(engine, "batchload", [batchload(User.addresses, batch_size)])
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,53 @@
+__author__ = 'davis'
+"""
+Change the fullname of every other User and delete every tenth one,
+loading each object versus bulk_update() / bulk_delete().
+
+    python benchmark-bulk-dml.py [users]
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from bulk_dml import bulk_update, bulk_delete
+from users import User, setup
+
+USERS = 1000000
+
+
+def one_at_a_time(session):
+    for user in session.query(User).filter(User.id % 2 == 0):
+        user.fullname = 'Even Steven'
+    for user in session.query(User).filter(User.id % 10 == 0):
+        session.delete(user)
+
+
+def set_based(session):
+    bulk_update(session.query(User).filter(User.id % 2 == 0),
+                {User.fullname: 'Even Steven'})
+    bulk_delete(session.query(User).filter(User.id % 10 == 0))
+
+
+def run(label, change, count):
+    engine = setup(count)
+    session = Session(bind=engine)
+    start = time.time()
+    change(session)
+    session.commit()
+    elapsed = time.time() - start
+    remaining = session.query(User).filter(
+        User.fullname == 'Even Steven').count()
+    print("%-16s %.2f sec (%d rows updated and kept)" % (
+        label, elapsed, remaining))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    run("one at a time", one_at_a_time, count)
+    run("set based", set_based, count)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
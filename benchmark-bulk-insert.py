@@ -0,0 +1,70 @@
+__author__ = 'davis'
+"""
+Insert users and their addresses, per-row inserted_primary_key
+versus insert_returning_keys().
+
+    python benchmark-bulk-insert.py [users]
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+
+import bulk_insert
+
+USERS = 100000
+ADDRESSES_PER_USER = 2
+
+metadata = MetaData()
+user_table = Table('user', metadata,
+                   Column('id', Integer, primary_key=True),
+                   Column('username', String(50)),
+                   Column('fullname', String)
+                   )
+address_table = Table('address', metadata,
+                      Column('id', Integer, primary_key=True),
+                      Column('user_id', Integer, ForeignKey('user.id'),
+                             nullable=False),
+                      Column('email_address', String(100), nullable=False)
+                      )
+
+
+def users(count):
+    return [{'username': 'user%d' % i, 'fullname': 'User %d' % i}
+            for i in range(count)]
+
+
+def addresses(user_ids):
+    return [{'user_id': uid, 'email_address': 'u%d_%d@example.com' % (uid, n)}
+            for uid in user_ids for n in range(ADDRESSES_PER_USER)]
+
+
+def per_row(conn, rows):
+    return [conn.execute(user_table.insert(), row).inserted_primary_key[0]
+            for row in rows]
+
+
+def run(label, insert_users, count):
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    rows = users(count)
+    start = time.time()
+    with engine.begin() as conn:
+        user_ids = insert_users(conn, rows)
+        conn.execute(address_table.insert(), addresses(user_ids))
+    elapsed = time.time() - start
+    print("%-24s %d users + %d addresses in %.2f sec" % (
+        label, count, count * ADDRESSES_PER_USER, elapsed))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    run("per-row primary key", per_row, count)
+    run("insert_returning_keys", lambda conn, rows:
+        bulk_insert.insert_returning_keys(conn, user_table, rows), count)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,53 @@
+__author__ = 'davis'
+"""
+Load employees three ways and compare throughput.
+
+    python benchmark-bulk-load.py [rows] [batch size]
+
+Per-row autocommit commits (and on a file database, fsyncs) once per
+row, so it only loads PER_ROW_LIMIT rows; rows/sec is still comparable.
+"""
+
+import os
+import sys
+
+from sqlalchemy import create_engine
+
+import bulk_load
+import employee
+
+DB_FILE = "bench_bulk_load.db"
+ROWS = 1000000
+BATCH_SIZE = 10000
+PER_ROW_LIMIT = 5000
+
+
+def fresh_engine():
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    engine = create_engine("sqlite:///%s" % DB_FILE)
+    employee.metadata.create_all(engine)
+    return engine
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else ROWS
+    batch_size = int(argv[2]) if len(argv) > 2 else BATCH_SIZE
+    table = employee.employee_table
+
+    report = bulk_load.load_per_row(
+        fresh_engine(), table,
+        employee.generate_employees(min(rows, PER_ROW_LIMIT)))
+    print("per-row autocommit: %s" % (report,))
+
+    report = bulk_load.load(
+        fresh_engine(), table, employee.generate_employees(rows), batch_size)
+    print("executemany:        %s" % (report,))
+
+    report = bulk_load.load_multivalues(
+        fresh_engine(), table, employee.generate_employees(rows), batch_size)
+    print("multi-VALUES:       %s" % (report,))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
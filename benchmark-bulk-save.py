@@ -0,0 +1,45 @@
+__author__ = 'davis'
+"""
+Insert User objects with add_all() + commit() and with bulk_add_all().
+
+    python benchmark-bulk-save.py [users]
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from bulk_save import bulk_add_all
+from users import User, setup
+
+USERS = 500000
+
+
+def users(count):
+    return [User(name='user%d' % i, fullname='User %d' % i)
+            for i in range(count)]
+
+
+def run(label, save, count):
+    engine = setup(0)
+    session = Session(bind=engine)
+    objects = users(count)
+    start = time.time()
+    save(session, objects)
+    session.commit()
+    elapsed = time.time() - start
+    print("%-32s %d users in %.2f sec, %.0f users/sec" % (
+        label, count, elapsed, count / elapsed))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    run("add_all()", lambda session, objs: session.add_all(objs), count)
+    run("bulk_add_all()", bulk_add_all, count)
+    run("bulk_add_all(return_defaults)", lambda session, objs:
+        bulk_add_all(session, objs, return_defaults=True), count)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,63 @@
+__author__ = 'davis'
+"""
+Eager load User.addresses and Address.user with subqueryload(),
+joinedload(), selectinload() and chunkload() and compare queries and
+wall time.
+
+    python benchmark-chunkload.py [parents,parents,...] [chunk size]
+
+defaults to 1000, 100000 and 1000000 parents.
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session, configure_mappers
+from sqlalchemy.orm import subqueryload, joinedload, selectinload
+
+from batchload import chunkload
+from query_stats import QueryStats
+from users import User, Address, setup
+
+PARENTS = [1000, 100000, 1000000]
+ADDRESSES_PER_USER = 2
+CHUNK_SIZE = 500
+
+
+def run(engine, label, entity, attr, option):
+    session = Session(bind=engine)
+    start = time.time()
+    with QueryStats(engine) as stats:
+        for obj in session.query(entity).options(option):
+            getattr(obj, attr)
+    elapsed = time.time() - start
+    session.close()
+    print("  %-30s %6d queries %8.2f sec" % (label, stats.count, elapsed))
+
+
+def main(argv):
+    parents = PARENTS
+    if len(argv) > 1:
+        parents = [int(p) for p in argv[1].split(',')]
+    chunk_size = int(argv[2]) if len(argv) > 2 else CHUNK_SIZE
+    # sets up the User.addresses backref
+    configure_mappers()
+
+    for count in parents:
+        engine = setup(count, ADDRESSES_PER_USER)
+        print("%d users, %d addresses" % (count, count * ADDRESSES_PER_USER))
+        for name, option in [
+            ('subqueryload', subqueryload),
+            ('joinedload', joinedload),
+            ('selectinload', selectinload),
+            ('chunkload', lambda attr: chunkload(attr, chunk_size)),
+        ]:
+            run(engine, "%s(User.addresses)" % name, User, 'addresses',
+                option(User.addresses))
+            run(engine, "%s(Address.user)" % name, Address, 'user',
+                option(Address.user))
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
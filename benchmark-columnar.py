@@ -0,0 +1,71 @@
+__author__ = 'davis'
+"""
+Fetch a select of users into one array per column: fetchall() plus a
+list comprehension per column, fetch_columns() and fetch_arrays().
+
+    python benchmark-columnar.py [rows]
+
+The default is a million rows; pass 5000000 for the full run.
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float
+
+from bulk_load import batches
+from columnar import fetch_columns, fetch_arrays, numpy
+
+ROWS = 1000000
+
+metadata = MetaData()
+user_table = Table('user', metadata,
+                   Column('id', Integer, primary_key=True),
+                   Column('username', String(50)),
+                   Column('fullname', String(50)),
+                   Column('score', Float))
+
+
+def setup(count):
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        for chunk in batches((
+                {'id': i, 'username': 'user%d' % i,
+                 'fullname': 'User %d' % i, 'score': i * 0.5}
+                for i in range(1, count + 1)), 10000):
+            conn.execute(user_table.insert(), chunk)
+    return engine
+
+
+def rows(result):
+    rows = result.fetchall()
+    columns = dict((key, [row[key] for row in rows])
+                   for key in result.keys())
+    if numpy is not None:
+        columns['id'] = numpy.array(columns['id'])
+        columns['score'] = numpy.array(columns['score'])
+    return columns
+
+
+def run(engine, label, fetch):
+    with engine.connect() as conn:
+        result = conn.execute(select([user_table]))
+        start = time.time()
+        columns = fetch(result)
+        elapsed = time.time() - start
+    print("%-14s %d rows in %.2f sec, sum(score) %.1f" % (
+        label, len(columns['id']), elapsed, sum(columns['score'])))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else ROWS
+    engine = setup(count)
+    run(engine, "fetchall", rows)
+    run(engine, "fetch_columns", fetch_columns)
+    if numpy is not None:
+        run(engine, "fetch_arrays", fetch_arrays)
+
+if __name__ == '__main__':
+    main(sys.argv)
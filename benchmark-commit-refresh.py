@@ -0,0 +1,51 @@
+__author__ = 'davis'
+"""
+Touch every User after a commit: the default full expiry, keeping
+flushed values, and batched refresh.
+
+    python benchmark-commit-refresh.py [users] [batch_size]
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from commit_refresh import keep_flushed_on_commit, batch_refresh_on_commit
+from query_stats import QueryStats
+from users import User, setup
+
+USERS = 10000
+BATCH_SIZE = 500
+
+
+def run(engine, label, configure):
+    session = Session(bind=engine)
+    configure(session)
+    users = session.query(User).all()
+    # half of them get changed, the rest are just held on to
+    for user in users[::2]:
+        user.fullname = user.fullname.upper()
+    session.commit()
+
+    start = time.time()
+    with QueryStats(engine) as stats:
+        for user in users:
+            user.fullname
+    elapsed = time.time() - start
+    print("%-10s %d users in %.3f sec, %d SELECTs" % (
+        label, len(users), elapsed, stats.count))
+    session.close()
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    batch_size = int(argv[2]) if len(argv) > 2 else BATCH_SIZE
+    engine = setup(count)
+    run(engine, "expire", lambda session: None)
+    run(engine, "keep", keep_flushed_on_commit)
+    run(engine, "batch",
+        lambda session: batch_refresh_on_commit(session, batch_size))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,71 @@
+__author__ = 'davis'
+"""
+Bytes per loaded User object, default InstanceState versus
+compact_state.compact().
+
+    python benchmark-compact-state.py [users]
+
+Memory is measured with tracemalloc where available (python 3.4+),
+otherwise from the growth of peak RSS, which is much coarser.
+"""
+
+import gc
+import resource
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+
+from compact_state import compact
+from users import User, user_table, setup
+
+USERS = 1000000
+
+CompactBase = declarative_base()
+
+
+@compact
+class CompactUser(CompactBase):
+    __table__ = user_table
+
+
+def memory_used():
+    if tracemalloc is not None:
+        return tracemalloc.get_traced_memory()[0]
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run(engine, cls, count):
+    session = Session(bind=engine)
+    gc.collect()
+    before = memory_used()
+    start = time.time()
+    objects = session.query(cls).all()
+    elapsed = time.time() - start
+    gc.collect()
+    used = memory_used() - before
+    print("%-12s %d objects in %.2f sec, %d bytes/object" % (
+        cls.__name__, len(objects), elapsed, used // len(objects)))
+    del objects
+    session.close()
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    engine = setup(count)
+    if tracemalloc is not None:
+        tracemalloc.start()
+    # compact first, so the coarse RSS fallback isn't hidden by the
+    # peak left behind by the default run
+    run(engine, CompactUser, count)
+    run(engine, User, count)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,62 @@
+__author__ = 'davis'
+"""
+Compile the presentation-3.py statements against sqlite, mysql and
+postgresql and report per-statement compile time and allocations.
+
+    python benchmark-compile.py                      # report
+    python benchmark-compile.py --save base.json     # record a baseline
+    python benchmark-compile.py --baseline base.json # fail on regressions
+    python benchmark-compile.py --profile join postgresql
+"""
+
+import argparse
+import sys
+
+import compile_profile
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200,
+                        help='compiles per timing run')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write results to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare against results saved in FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline')
+    parser.add_argument('--profile', nargs=2,
+                        metavar=('STATEMENT', 'DIALECT'),
+                        help='cProfile one statement / dialect')
+    options = parser.parse_args(argv[1:])
+
+    if options.profile:
+        compile_profile.profile(*options.profile)
+        return 0
+
+    results = compile_profile.run(options.number)
+    print("%-20s %-12s %10s %12s %11s %10s" % (
+        'statement', 'dialect', 'usec', 'alloc blocks', 'alloc bytes',
+        'peak bytes'))
+    for r in results:
+        print("%-20s %-12s %10.1f %12s %11s %10s" % (
+            r['statement'], r['dialect'], r['usec'], r['alloc_blocks'],
+            r['alloc_bytes'], r['peak_bytes']))
+
+    if options.save:
+        compile_profile.save(results, options.save)
+
+    if options.baseline:
+        baseline = compile_profile.load(options.baseline)
+        failed = list(compile_profile.regressions(
+            results, baseline, options.tolerance))
+        for r, before in failed:
+            print("REGRESSION %s / %s: %.1f usec, was %.1f usec" % (
+                r['statement'], r['dialect'], r['usec'], before))
+        if failed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,50 @@
+__author__ = 'davis'
+"""
+fetchall() plus key and attribute access on every row, with RowProxy
+and with FastRow.
+
+    python benchmark-fast-rows.py [rows]
+
+The default is a million rows; pass 10000000 for the full run.
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine, select
+
+from employee import metadata, employee_table, populate
+from fast_rows import fetchall
+
+ROWS = 1000000
+
+
+def run(engine, label, fetch):
+    with engine.connect() as conn:
+        result = conn.execute(select([employee_table]))
+        start = time.time()
+        rows = fetch(result)
+        fetched = time.time()
+        for row in rows:
+            row['emp_name']
+            row['emp_id']
+        keyed = time.time()
+        for row in rows:
+            row.emp_id
+        done = time.time()
+    print("%-10s %d rows, fetchall %.2f sec, row[key] %.2f sec, "
+          "row.attr %.2f sec, total %.2f sec" % (
+              label, len(rows), fetched - start, keyed - fetched,
+              done - keyed, done - start))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else ROWS
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    populate(engine, count)
+    run(engine, "RowProxy", lambda result: result.fetchall())
+    run(engine, "FastRow", fetchall)
+
+if __name__ == '__main__':
+    main(sys.argv)
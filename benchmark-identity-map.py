@@ -0,0 +1,53 @@
+__author__ = 'davis'
+"""
+Walk a large User table three ways and watch the identity map:
+query.all(), a plain for loop over the Query, and identity_stats.iterate().
+
+    python benchmark-identity-map.py [users]
+"""
+
+import resource
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+import identity_stats
+from users import User, setup
+
+USERS = 1000000
+
+
+def run(engine, label, rows):
+    session = Session(bind=engine)
+    start = time.time()
+    largest = 0
+    for i, user in enumerate(rows(session)):
+        if i % 10000 == 0:
+            largest = max(largest, len(session.identity_map))
+    elapsed = time.time() - start
+    print("%-12s %.2f sec, largest identity map %d, peak RSS %d KB" % (
+        label, elapsed, largest,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    session.close()
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    engine = setup(count)
+
+    # run the bounded version first, peak RSS only ever goes up
+    run(engine, "iterate()",
+        lambda session: identity_stats.iterate(session.query(User)))
+    run(engine, "for loop", lambda session: session.query(User))
+    run(engine, "all()", lambda session: session.query(User).all())
+
+    session = Session(bind=engine)
+    users = session.query(User).limit(10000).all()
+    for user in users[:100]:
+        user.fullname = 'changed'
+    print(identity_stats.format_report(session))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,56 @@
+__author__ = 'davis'
+"""
+Page through every User with keyset pagination, and time pages at
+increasing depth against the same page with OFFSET.
+
+    python benchmark-keyset.py [users] [page_size]
+
+The default is a million users; the request's ten million works too
+(python benchmark-keyset.py 10000000), it just takes a while to insert.
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from keyset import KeysetQuery
+from users import User, setup
+
+USERS = 1000000
+PAGE_SIZE = 100
+CHECKPOINTS = 5
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    page_size = int(argv[2]) if len(argv) > 2 else PAGE_SIZE
+    engine = setup(count)
+    session = Session(bind=engine, query_cls=KeysetQuery)
+    query = session.query(User).order_by(User.id)
+
+    pages = count // page_size
+    every = max(pages // CHECKPOINTS, 1)
+    print("%10s %14s %14s" % ("page", "keyset msec", "offset msec"))
+    token = None
+    start = time.time()
+    for number in range(pages):
+        before = time.time()
+        page = query.keyset_page(page_size, token)
+        keyset = time.time() - before
+        if number % every == 0 or page.token is None:
+            before = time.time()
+            offset = query[number * page_size:(number + 1) * page_size]
+            elapsed = time.time() - before
+            assert [u.id for u in offset] == [u.id for u in page.items]
+            print("%10d %14.2f %14.2f" % (
+                number, keyset * 1000, elapsed * 1000))
+        session.expunge_all()
+        token = page.token
+        if token is None:
+            break
+    print("%d pages of %d in %.2f sec" % (
+        number + 1, page_size, time.time() - start))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,72 @@
+__author__ = 'davis'
+"""
+create_all() / drop_all() on a generated 500 table schema, with
+MetaData and with parallel_ddl.
+
+    python benchmark-parallel-ddl.py [tables] [url] [workers]
+
+The default database is a SQLite file, where parallel_ddl runs serially
+in one transaction; give a PostgreSQL or MySQL url to see the levels run
+on several connections.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+
+import parallel_ddl
+
+TABLES = 500
+WORKERS = 8
+
+
+def generate(count):
+    metadata = MetaData()
+    for i in range(count):
+        columns = [Column('id', Integer, primary_key=True),
+                   Column('name', String(50), index=True),
+                   Column('value', Integer)]
+        if i:
+            columns.append(Column('parent_id', Integer,
+                                  ForeignKey('t%d.id' % (i // 2))))
+        Table('t%d' % i, metadata, *columns)
+    return metadata
+
+
+def timed(label, fn):
+    start = time.time()
+    fn()
+    print("%-24s %.2f sec" % (label, time.time() - start))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else TABLES
+    workers = int(argv[3]) if len(argv) > 3 else WORKERS
+    tmp = tempfile.mkdtemp()
+    try:
+        url = argv[2] if len(argv) > 2 else \
+            "sqlite:///%s" % os.path.join(tmp, 'db')
+        if url.startswith('sqlite'):
+            engine = create_engine(url)
+        else:
+            engine = create_engine(url, pool_size=workers)
+        metadata = generate(count)
+        print("%d tables in %d dependency levels" % (
+            count, len(parallel_ddl.levels(metadata.tables.values()))))
+        timed("metadata.create_all", lambda: metadata.create_all(engine))
+        timed("metadata.drop_all", lambda: metadata.drop_all(engine))
+        timed("parallel_ddl.create_all", lambda: parallel_ddl.create_all(
+            engine, metadata, workers=workers))
+        timed("parallel_ddl.drop_all", lambda: parallel_ddl.drop_all(
+            engine, metadata, workers=workers))
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
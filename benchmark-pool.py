@@ -0,0 +1,93 @@
+__author__ = 'davis'
+"""
+Hammer engine.connect() / conn.execute() from a pool of threads for a
+range of pool_size / max_overflow settings and print what the pool
+went through for each one.
+
+    python benchmark-pool.py [threads] [requests per thread]
+
+WORK_SECONDS stands in for the time a request holds its connection
+doing something other than SQL.
+"""
+
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import create_engine, select, bindparam
+from sqlalchemy.pool import QueuePool
+
+import employee
+import pool_stats
+
+DB_FILE = "bench_pool.db"
+THREADS = 32
+REQUESTS = 200
+WORK_SECONDS = 0.002
+SETTINGS = [
+    # (pool_size, max_overflow)
+    (1, 0),
+    (5, 0),
+    (5, 10),
+    (10, 10),
+    (20, 20),
+]
+
+
+def make_engine(pool_size, max_overflow):
+    return create_engine("sqlite:///%s" % DB_FILE,
+                         poolclass=QueuePool,
+                         pool_size=pool_size,
+                         max_overflow=max_overflow,
+                         pool_timeout=60,
+                         connect_args={'check_same_thread': False})
+
+
+def worker(monitor, requests, stmt):
+    for i in range(requests):
+        conn = monitor.connect()
+        try:
+            conn.execute(stmt, emp_id=i + 1).fetchall()
+            time.sleep(WORK_SECONDS)
+        finally:
+            conn.close()
+
+
+def run(pool_size, max_overflow, threads, requests):
+    engine = make_engine(pool_size, max_overflow)
+    monitor = pool_stats.PoolMonitor(engine)
+    emp = employee.employee_table
+    stmt = select([emp]).where(emp.c.emp_id == bindparam('emp_id'))
+
+    workers = [threading.Thread(target=worker,
+                                args=(monitor, requests, stmt))
+               for i in range(threads)]
+    start = time.time()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.time() - start
+    engine.dispose()
+
+    print("pool_size=%d max_overflow=%d: %d requests in %.2f sec, "
+          "%.0f requests/sec" % (pool_size, max_overflow, threads * requests,
+                                 elapsed, threads * requests / elapsed))
+    print(monitor.report())
+    print("")
+
+
+def main(argv):
+    threads = int(argv[1]) if len(argv) > 1 else THREADS
+    requests = int(argv[2]) if len(argv) > 2 else REQUESTS
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    employee.populate(create_engine("sqlite:///%s" % DB_FILE), 10000)
+
+    for pool_size, max_overflow in SETTINGS:
+        run(pool_size, max_overflow, threads, requests)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,56 @@
+__author__ = 'davis'
+"""
+Per-call overhead of looking up a User by name with a regular Query and
+with a PreparedQuery.
+
+    python benchmark-prepared.py [calls]
+"""
+
+import sys
+import time
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+
+from prepared import PreparedQuery
+from users import User, setup
+
+CALLS = 20000
+USERS = 100
+
+
+users_by_name = PreparedQuery(
+    lambda session: session.query(User).
+    filter(User.name == bindparam('name')).
+    order_by(User.id))
+
+
+def regular(session, name):
+    return session.query(User).filter(User.name == name).\
+        order_by(User.id).first()
+
+
+def prepared(session, name):
+    return users_by_name(session, name=name).first()
+
+
+def run(engine, label, lookup, calls):
+    session = Session(bind=engine)
+    start = time.time()
+    for i in range(calls):
+        user = lookup(session, 'user%d' % (i % USERS + 1))
+        assert user.id == i % USERS + 1
+    elapsed = time.time() - start
+    print("%-10s %d calls in %.2f sec, %.1f usec/call" % (
+        label, calls, elapsed, elapsed / calls * 1000000))
+    session.close()
+
+
+def main(argv):
+    calls = int(argv[1]) if len(argv) > 1 else CALLS
+    engine = setup(USERS)
+    run(engine, "query", regular, calls)
+    run(engine, "prepared", prepared, calls)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,81 @@
+__author__ = 'davis'
+"""
+Reflect a generated schema table by table, with MetaData.reflect(),
+with bulk_reflect.reflect() and from a bulk_reflect snapshot.
+
+    python benchmark-reflect.py [tables]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+from sqlalchemy.engine.reflection import Inspector
+
+from bulk_reflect import reflect
+
+TABLES = 1000
+
+
+def generate(engine, count):
+    metadata = MetaData()
+    for i in range(count):
+        columns = [Column('id', Integer, primary_key=True),
+                   Column('name', String(50), index=True),
+                   Column('value', Integer)]
+        if i:
+            columns.append(Column('parent_id', Integer,
+                                  ForeignKey('t%d.id' % (i // 2))))
+        Table('t%d' % i, metadata, *columns)
+    metadata.create_all(engine)
+
+
+def autoload(engine):
+    metadata = MetaData()
+    for name in Inspector.from_engine(engine).get_table_names():
+        Table(name, metadata, autoload=True, autoload_with=engine)
+    return metadata
+
+
+def metadata_reflect(engine):
+    metadata = MetaData()
+    metadata.reflect(engine)
+    return metadata
+
+
+def run(engine, label, fn):
+    queries = []
+
+    def count(*arg):
+        queries.append(1)
+    event.listen(engine, 'before_cursor_execute', count)
+    start = time.time()
+    metadata = fn(engine)
+    elapsed = time.time() - start
+    event.remove(engine, 'before_cursor_execute', count)
+    print("%-12s %d tables in %.2f sec, %d queries" % (
+        label, len(metadata.tables), elapsed, len(queries)))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else TABLES
+    tmp = tempfile.mkdtemp()
+    try:
+        engine = create_engine("sqlite:///%s" % os.path.join(tmp, 'db'))
+        generate(engine, count)
+        snapshot = os.path.join(tmp, 'schema.pickle')
+        run(engine, "autoload", autoload)
+        run(engine, "reflect()", metadata_reflect)
+        run(engine, "bulk", reflect)
+        run(engine, "cold", lambda engine: reflect(engine, snapshot=snapshot))
+        run(engine, "warm", lambda engine: reflect(engine, snapshot=snapshot))
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,61 @@
+__author__ = 'davis'
+"""
+Look up users by name over and over, uncached, through the memory
+backend and through the dbm backend.
+
+    python benchmark-result-cache.py [lookups] [users]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy.orm import Session
+
+from result_cache import (CachingQuery, ResultCache, MemoryBackend,
+                          DbmBackend)
+from users import User, setup
+
+LOOKUPS = 20000
+USERS = 1000
+
+
+def run(engine, label, cache, lookups, users):
+    session = Session(bind=engine, query_cls=CachingQuery)
+    if cache is not None:
+        cache.invalidate_on_flush(session)
+    start = time.time()
+    for i in range(lookups):
+        query = session.query(User).filter_by(name='user%d' % (i % 50 + 1))
+        if cache is not None:
+            query = query.cached(cache)
+        user = query.first()
+        if i % 1000 == 999:
+            # a write every so often, which invalidates the user table
+            user.fullname = 'Changed %d' % i
+            session.commit()
+    elapsed = time.time() - start
+    print("%-10s %d lookups in %.2f sec, %.0f lookups/sec%s" % (
+        label, lookups, elapsed, lookups / elapsed,
+        ", " + cache.stats() if cache is not None else ""))
+    session.close()
+
+
+def main(argv):
+    lookups = int(argv[1]) if len(argv) > 1 else LOOKUPS
+    users = int(argv[2]) if len(argv) > 2 else USERS
+    engine = setup(users)
+    run(engine, "uncached", None, lookups, users)
+    run(engine, "memory", ResultCache(MemoryBackend()), lookups, users)
+    tmp = tempfile.mkdtemp()
+    try:
+        backend = DbmBackend(os.path.join(tmp, 'results'))
+        run(engine, "dbm", ResultCache(backend), lookups, users)
+        backend.close()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
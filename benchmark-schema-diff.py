@@ -0,0 +1,67 @@
+__author__ = 'davis'
+"""
+Diff a generated MetaData against a database holding the same schema
+plus a few differences.
+
+    python benchmark-schema-diff.py [tables]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+
+from bulk_reflect import reflect
+from schema_diff import compare, ddl
+
+TABLES = 2000
+
+
+def generate(count, extra=False):
+    metadata = MetaData()
+    for i in range(count):
+        columns = [Column('id', Integer, primary_key=True),
+                   Column('name', String(50), index=True),
+                   Column('value', Integer)]
+        if i:
+            columns.append(Column('parent_id', Integer,
+                                  ForeignKey('t%d.id' % (i // 2))))
+        if extra and i % 500 == 0:
+            columns.append(Column('added', String(20)))
+        Table('t%d' % i, metadata, *columns)
+    if extra:
+        Table('brand_new', metadata, Column('id', Integer, primary_key=True))
+    return metadata
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else TABLES
+    tmp = tempfile.mkdtemp()
+    try:
+        engine = create_engine("sqlite:///%s" % os.path.join(tmp, 'db'))
+        generate(count).create_all(engine)
+        metadata = generate(count, extra=True)
+
+        start = time.time()
+        changes = compare(metadata, engine)
+        elapsed = time.time() - start
+        print("reflect and diff %d tables: %.2f sec, %d changes" % (
+            count, elapsed, len(changes)))
+
+        reflected = reflect(engine)
+        start = time.time()
+        changes = compare(metadata, reflected, dialect=engine.dialect)
+        elapsed = time.time() - start
+        print("diff against reflected MetaData: %.2f sec" % elapsed)
+        for statement in ddl(changes, engine.dialect):
+            print(statement)
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
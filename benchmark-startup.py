@@ -0,0 +1,145 @@
+__author__ = 'davis'
+"""
+Startup time of a generated models module - import plus the first
+query - with declarative Columns, and with the tables coming from a
+metadata_snapshot file (first run builds it, later runs load it).
+
+    python benchmark-startup.py [models] [runs]
+
+Each run is a fresh interpreter.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+MODELS = 300
+RUNS = 3
+COLUMNS = 10
+
+DECLARATIVE = '''
+from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+
+Base = declarative_base()
+'''
+
+DECLARATIVE_MODEL = '''
+class Model%(i)d(Base):
+    __tablename__ = 't%(i)d'
+    id = Column(Integer, primary_key=True)
+%(columns)s
+%(parent)s
+'''
+
+SNAPSHOT = '''
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+
+from metadata_snapshot import cached_metadata
+
+
+def build():
+    metadata = MetaData()
+%(tables)s
+    return metadata
+
+metadata = cached_metadata(%(path)r, build)
+Base = declarative_base(metadata=metadata)
+'''
+
+SNAPSHOT_TABLE = '''
+    Table('t%(i)d', metadata,
+          Column('id', Integer, primary_key=True),
+%(columns)s
+%(parent)s
+          )
+'''
+
+SNAPSHOT_MODEL = '''
+class Model%(i)d(Base):
+    __table__ = metadata.tables['t%(i)d']
+%(parent)s
+'''
+
+TIMER = '''
+import time
+start = time.time()
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+import models
+engine = create_engine("sqlite://")
+models.Base.metadata.create_all(engine, tables=[
+    models.Base.metadata.tables['t%d' % i] for i in (0, 1)])
+Session(bind=engine).query(models.Model1).first()
+print(time.time() - start)
+'''
+
+
+def declarative(count):
+    source = [DECLARATIVE]
+    for i in range(count):
+        columns = '\n'.join(
+            "    c%d = Column(String(50), index=%s)" % (j, j == 0)
+            for j in range(COLUMNS))
+        parent = ''
+        if i:
+            parent = ("    parent_id = Column(Integer, "
+                      "ForeignKey('t%d.id'))\n"
+                      "    parent = relationship('Model%d')" % (
+                          i // 2, i // 2))
+        source.append(DECLARATIVE_MODEL % {
+            'i': i, 'columns': columns, 'parent': parent})
+    return ''.join(source)
+
+
+def snapshot(count, path):
+    tables = []
+    models = []
+    for i in range(count):
+        columns = '\n'.join(
+            "          Column('c%d', String(50), index=%s)," % (j, j == 0)
+            for j in range(COLUMNS))
+        parent = ''
+        model_parent = ''
+        if i:
+            parent = ("          Column('parent_id', Integer, "
+                      "ForeignKey('t%d.id'))," % (i // 2))
+            model_parent = "    parent = relationship('Model%d')" % (i // 2)
+        tables.append(SNAPSHOT_TABLE % {
+            'i': i, 'columns': columns, 'parent': parent})
+        models.append(SNAPSHOT_MODEL % {'i': i, 'parent': model_parent})
+    return SNAPSHOT % {'tables': ''.join(tables), 'path': path} + \
+        ''.join(models)
+
+
+def run(directory, label, source, runs):
+    with open(os.path.join(directory, 'models.py'), 'w') as f:
+        f.write(source)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [directory, os.path.dirname(os.path.abspath(__file__))])
+    for run in range(runs):
+        elapsed = float(subprocess.check_output(
+            [sys.executable, '-c', TIMER], env=env))
+        print("%-12s run %d: %.3f sec to import and query" % (
+            label, run + 1, elapsed))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else MODELS
+    runs = int(argv[2]) if len(argv) > 2 else RUNS
+    tmp = tempfile.mkdtemp()
+    try:
+        run(tmp, "declarative", declarative(count), runs)
+        run(tmp, "snapshot", snapshot(
+            count, os.path.join(tmp, 'models.pickle')), runs)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv)
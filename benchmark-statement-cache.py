@@ -0,0 +1,70 @@
+__author__ = 'davis'
+"""
+Statements/sec for repeated selects with varying parameters, built
+fresh each time the way presentation-3.py does, with and without
+StatementCache.
+
+    python benchmark-statement-cache.py [iterations]
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import select, func
+
+from statement_cache import StatementCache
+from users import metadata, user_table, address_table
+
+ITERATIONS = 20000
+NAMES = ['ed', 'jack', 'wendy', 'mary', 'fred']
+
+
+def by_name(i):
+    return select([user_table]).\
+        where(user_table.c.name == NAMES[i % len(NAMES)])
+
+
+def name_plus_count(i):
+    address_subq = select([
+        address_table.c.user_id,
+        func.count(address_table.c.id).label('count')
+    ]).group_by(address_table.c.user_id).alias()
+    return select([user_table.c.name, address_subq.c.count]).\
+        select_from(user_table.join(address_subq)).\
+        where(user_table.c.id > i % 3).\
+        order_by(user_table.c.name)
+
+
+def run(conn, build, iterations, cache):
+    start = time.time()
+    for i in range(iterations):
+        stmt = build(i)
+        if cache is None:
+            conn.execute(stmt).fetchall()
+        else:
+            cache.execute(conn, stmt).fetchall()
+    return iterations / (time.time() - start)
+
+
+def main(argv):
+    iterations = int(argv[1]) if len(argv) > 1 else ITERATIONS
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    conn = engine.connect()
+    conn.execute(user_table.insert(), [
+        {'name': name, 'fullname': name.title()} for name in NAMES])
+    conn.execute(address_table.insert(), [
+        {'user_id': uid, 'email_address': 'addr%d@example.com' % uid}
+        for uid in range(1, len(NAMES) + 1)])
+
+    for build in (by_name, name_plus_count):
+        uncached = run(conn, build, iterations, None)
+        cache = StatementCache()
+        cached = run(conn, build, iterations, cache)
+        print("%-20s uncached %8.0f stmts/sec   cached %8.0f stmts/sec  "
+              "(%s)" % (build.__name__, uncached, cached, cache.stats()))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,83 @@
+__author__ = 'davis'
+"""
+Compare fetchall() against streaming partitions over a large
+employee table.
+
+    python benchmark-streaming.py [rows] [partition size]
+
+Each mode runs in its own process so that peak RSS is measured
+for that mode alone.
+"""
+
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine, select
+
+import employee
+import streaming
+
+DB_URL = "sqlite:///bench_streaming.db"
+ROWS = 2000000
+PARTITION_SIZE = 10000
+
+
+def peak_rss_kb():
+    # ru_maxrss is kilobytes on linux, bytes on OS X
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        usage = usage // 1024
+    return usage
+
+
+def run_fetchall(engine, size):
+    result = engine.execute(select([employee.employee_table]))
+    count = 0
+    for row in result.fetchall():
+        count += 1
+    return count
+
+
+def run_streaming(engine, size):
+    count = 0
+    stmt = select([employee.employee_table])
+    for rows in streaming.stream_partitions(engine, stmt, size):
+        for row in rows:
+            count += 1
+    return count
+
+
+MODES = {
+    'fetchall': run_fetchall,
+    'streaming': run_streaming,
+}
+
+
+def child(mode, size):
+    engine = create_engine(DB_URL)
+    start = time.time()
+    count = MODES[mode](engine, size)
+    elapsed = time.time() - start
+    print("%-10s %10d rows %8.2f sec %12.0f rows/sec %10d KB peak RSS" % (
+        mode, count, elapsed, count / elapsed, peak_rss_kb()))
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else ROWS
+    size = int(argv[2]) if len(argv) > 2 else PARTITION_SIZE
+
+    print("populating %d employees" % rows)
+    employee.populate(create_engine(DB_URL), rows)
+
+    for mode in sorted(MODES):
+        subprocess.check_call(
+            [sys.executable, __file__, '--child', mode, str(size)])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(sys.argv)
@@ -0,0 +1,41 @@
+__author__ = 'davis'
+"""
+Load every User tracked (the normal Query) and untracked.
+
+    python benchmark-untracked.py [users]
+"""
+
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from untracked import UntrackedQuery
+from users import User, setup
+
+USERS = 1000000
+
+
+def run(engine, label, query):
+    session = Session(bind=engine, query_cls=UntrackedQuery)
+    start = time.time()
+    count = 0
+    for user in query(session):
+        user.name
+        count += 1
+    elapsed = time.time() - start
+    print("%-10s %d users in %.2f sec, %.0f users/sec, %d in identity map" % (
+        label, count, elapsed, count / elapsed, len(session.identity_map)))
+    session.close()
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else USERS
+    engine = setup(count)
+    run(engine, "tracked", lambda session: session.query(User).all())
+    run(engine, "untracked",
+        lambda session: session.query(User).untracked().all())
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,143 @@
+__author__ = 'davis'
+"""
+Set based UPDATE / DELETE that keep the Session honest.
+
+presentation-4.py edits objects one at a time:
+
+    ed_user.fullname = 'Ed Jones'
+    session.delete(jack)
+
+which first loads each object.  Query.update() / Query.delete() emit a
+single UPDATE or DELETE instead, and afterwards the objects already in
+the identity map have to be brought in line.  bulk_update() and
+bulk_delete() pick how:
+
+'evaluate'  run the WHERE criteria (and the new values) in Python
+            against the objects in the Session and apply the change.
+'fetch'     SELECT the matched primary keys before the statement.
+'expire'    expire the affected objects so they reload on next access.
+            Objects are matched in Python when the criteria allow it
+            and their attributes are loaded; anything that can't be
+            checked without a SELECT is expired.
+'auto'      nothing to do when no object of the class is loaded;
+            'evaluate' when the criteria and values can be evaluated in
+            Python and none of the loaded objects is expired; 'fetch'
+            otherwise, one SELECT of primary keys rather than a reload
+            of every loaded object.
+
+    bulk_update(session.query(User).filter(User.name.like('ed%')),
+                {User.fullname: 'Ed Jones'})
+
+Deleted objects that were expired raise ObjectDeletedError when next
+touched, just as if another transaction had deleted them.
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy import util
+from sqlalchemy.orm.evaluator import EvaluatorCompiler, UnevaluatableError
+from sqlalchemy.sql import expression
+
+SYNCHRONIZE = ('evaluate', 'fetch', 'expire', 'auto')
+
+
+def _mapper(query):
+    return query._only_full_mapper_zero("bulk_update / bulk_delete")
+
+
+def _criteria_evaluator(query):
+    """A Python callable for the query's WHERE clause.
+
+    Raises UnevaluatableError if the criteria can't be run in Python.
+    """
+    if query.whereclause is None:
+        return lambda obj: True
+    return EvaluatorCompiler(_mapper(query).class_).process(
+        query.whereclause)
+
+
+def _check_values(query, values):
+    compiler = EvaluatorCompiler(_mapper(query).class_)
+    for value in values.values():
+        compiler.process(expression._literal_as_binds(value))
+
+
+def _loaded_states(query):
+    mapper = _mapper(query)
+    for obj in list(query.session.identity_map.values()):
+        state = inspect(obj)
+        if state.mapper.isa(mapper):
+            yield state
+
+
+def _attribute_names(query, values):
+    mapper = _mapper(query)
+    names = []
+    for key in values:
+        if isinstance(key, util.string_types):
+            names.append(key)
+        elif hasattr(key, 'property'):
+            # User.fullname
+            names.append(key.key)
+        else:
+            # user_table.c.fullname
+            names.append(mapper.get_property_by_column(key).key)
+    return names
+
+
+def _resolve(query, values, synchronize):
+    if synchronize not in SYNCHRONIZE:
+        raise ValueError(
+            "synchronize must be one of %s" % ", ".join(SYNCHRONIZE))
+    if synchronize != 'auto':
+        return synchronize
+    states = list(_loaded_states(query))
+    if not states:
+        return False
+    if any(state.expired_attributes for state in states):
+        # evaluating would load each of them first
+        return 'fetch'
+    try:
+        _criteria_evaluator(query)
+        if values:
+            _check_values(query, values)
+    except UnevaluatableError:
+        return 'fetch'
+    return 'evaluate'
+
+
+def _expire_matched(query, attribute_names=None):
+    try:
+        evaluator = _criteria_evaluator(query)
+    except UnevaluatableError:
+        evaluator = None
+    session = query.session
+    for state in _loaded_states(query):
+        obj = state.obj()
+        if obj is None:
+            continue
+        if evaluator is not None and not state.expired_attributes and \
+                not evaluator(obj):
+            continue
+        session.expire(obj, attribute_names)
+
+
+def bulk_update(query, values, synchronize='auto'):
+    """UPDATE the rows matched by ``query``; return the row count."""
+    mode = _resolve(query, values, synchronize)
+    if mode != 'expire':
+        return query.update(values, synchronize_session=mode)
+
+    count = query.update(values, synchronize_session=False)
+    _expire_matched(query, _attribute_names(query, values))
+    return count
+
+
+def bulk_delete(query, synchronize='auto'):
+    """DELETE the rows matched by ``query``; return the row count."""
+    mode = _resolve(query, None, synchronize)
+    if mode != 'expire':
+        return query.delete(synchronize_session=mode)
+
+    count = query.delete(synchronize_session=False)
+    _expire_matched(query)
+    return count
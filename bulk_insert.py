@@ -0,0 +1,89 @@
+__author__ = 'davis'
+"""
+executemany() INSERTs that still hand back primary keys.
+
+result.inserted_primary_key is only available for single row inserts.
+insert_returning_keys() inserts a whole list with executemany() and works
+out the generated keys afterwards:
+
+* on SQLite, an integer primary key assigned by the database is one
+  more than the current max(pk), row after row.  Once the INSERT has
+  started, the transaction holds SQLite's write lock, so nothing else
+  can write to the table until it ends, and the new keys are the range
+  (max after - len(rows), max after] - checked by counting the rows in
+  it.  (Reading max(pk) *before* the INSERT wouldn't do: pysqlite
+  begins the transaction at the first INSERT, so another connection
+  could still commit in between.)
+
+* on other backends, or when the rows aren't eligible for the range
+  trick, it falls back to one execute() per row and collects
+  inserted_primary_key - correct, just not fast.
+
+    with engine.begin() as conn:
+        user_ids = insert_returning_keys(conn, user_table, users)
+        conn.execute(address_table.insert(), [
+            {'user_id': uid, 'email_address': email}
+            for uid, email in zip(user_ids, emails)])
+"""
+
+from sqlalchemy import exc
+from sqlalchemy import select, func
+from sqlalchemy import Integer
+
+
+def _single_integer_pk(table):
+    pk = list(table.primary_key.columns)
+    if len(pk) != 1:
+        return None
+    col = pk[0]
+    if not isinstance(col.type, Integer) or col.autoincrement is False:
+        return None
+    return col
+
+
+def can_infer_keys(conn, table, rows):
+    """True if keys for ``rows`` can be inferred as a rowid range."""
+    if conn.dialect.name != 'sqlite':
+        return False
+    if not conn.in_transaction():
+        return False
+    col = _single_integer_pk(table)
+    if col is None:
+        return False
+    # AUTOINCREMENT tables on sqlite may skip values after deletes
+    if table.kwargs.get('sqlite_autoincrement'):
+        return False
+    return not any(row.get(col.key) is not None for row in rows)
+
+
+def insert_returning_keys(conn, table, rows):
+    """Insert ``rows`` into ``table``; return the new primary key values.
+
+    ``conn`` must be a Connection with a transaction in progress, so
+    that the table can't change underneath us between the INSERT and
+    reading the keys.  Keys are returned in the same order as ``rows``.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    if can_infer_keys(conn, table, rows):
+        col = _single_integer_pk(table)
+        conn.execute(table.insert(), rows)
+        after = conn.scalar(select([func.max(col)]))
+        before = after - len(rows)
+        count = conn.scalar(select([func.count()]).where(col > before))
+        if count == len(rows):
+            return list(range(before + 1, after + 1))
+        # rowids past the largest integer are picked at random; don't
+        # guess
+        raise exc.InvalidRequestError(
+            "%s has %d rows in (%d, %d], expected %d" % (
+                table.name, count, before, after, len(rows)))
+
+    keys = []
+    for row in rows:
+        result = conn.execute(table.insert(), row)
+        pk = result.inserted_primary_key
+        keys.append(pk[0] if len(pk) == 1 else tuple(pk))
+    return keys
@@ -0,0 +1,103 @@
+__author__ = 'davis'
+"""
+Bulk ingestion.
+
+presentation-1.py inserts one row per engine.execute(), and since
+engine.execute() autocommits, every row is also its own transaction.
+load() instead takes any iterator of dictionaries, groups them into
+batches and sends each batch as a single executemany() call, all
+inside one engine.begin() transaction.
+"""
+
+import time
+from collections import namedtuple
+from itertools import islice
+
+DEFAULT_BATCH_SIZE = 10000
+
+# SQLITE_MAX_VARIABLE_NUMBER for the sqlite builds we still run on
+MAX_BOUND_PARAMETERS = 999
+
+
+class LoadReport(namedtuple('LoadReport', ['rows', 'batches', 'elapsed'])):
+    """How many rows went in, in how many batches, in how many seconds."""
+
+    @property
+    def rows_per_sec(self):
+        if not self.elapsed:
+            return 0.0
+        return self.rows / self.elapsed
+
+    def __str__(self):
+        return "%d rows in %d batches, %.2f sec, %.0f rows/sec" % (
+            self.rows, self.batches, self.elapsed, self.rows_per_sec)
+
+
+def batches(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Split an iterator of rows into lists of ``batch_size`` rows."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def load(engine, table, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert ``rows`` into ``table`` with executemany() in one transaction.
+
+    Each dictionary in ``rows`` must have the same keys, since the
+    INSERT statement is compiled once per batch from the first row.
+    Returns a LoadReport.
+    """
+    stmt = table.insert()
+    count = nbatches = 0
+    start = time.time()
+    with engine.begin() as conn:
+        for batch in batches(rows, batch_size):
+            conn.execute(stmt, batch)
+            count += len(batch)
+            nbatches += 1
+    return LoadReport(count, nbatches, time.time() - start)
+
+
+def load_multivalues(engine, table, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert ``rows`` using multi-row "INSERT ... VALUES (...), (...)".
+
+    The batch size is reduced if needed so that a single statement
+    never carries more than MAX_BOUND_PARAMETERS bound parameters.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return LoadReport(0, 0, 0.0)
+    batch_size = max(1, min(batch_size,
+                            MAX_BOUND_PARAMETERS // max(1, len(first))))
+
+    def chain():
+        yield first
+        for row in rows:
+            yield row
+
+    count = nbatches = 0
+    start = time.time()
+    with engine.begin() as conn:
+        for batch in batches(chain(), batch_size):
+            conn.execute(table.insert().values(batch))
+            count += len(batch)
+            nbatches += 1
+    return LoadReport(count, nbatches, time.time() - start)
+
+
+def load_per_row(engine, table, rows):
+    """The presentation-1.py way: one autocommitting execute() per row.
+
+    Only here so the benchmark has something to compare against.
+    """
+    stmt = table.insert()
+    count = 0
+    start = time.time()
+    for row in rows:
+        engine.execute(stmt, row)
+        count += 1
+    return LoadReport(count, count, time.time() - start)
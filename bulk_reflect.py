@@ -0,0 +1,241 @@
+__author__ = 'davis'
+"""
+Bulk, cached schema reflection.
+
+presentation-2.py reflects one table at a time,
+
+    Table('user', metadata2, autoload=True, autoload_with=engine)
+
+and loops over inspector.get_columns(tname).  On SQLite every table
+costs a PRAGMA table_info, foreign_key_list and index_list, a PRAGMA
+index_info per index and a SELECT of its CREATE TABLE - and a fresh
+Inspector per autoloaded Table, so none of it is shared.
+
+BulkInspector is an Inspector that, the first time it needs any of
+those, fetches them for *all* tables with a handful of queries, using
+SQLite's table-valued pragma functions (SQLite 3.16+):
+
+    SELECT m.name, p.* FROM sqlite_master AS m
+    JOIN pragma_table_info(m.name, 'main') AS p WHERE m.type = 'table'
+
+The dialect's own reflection code then runs as usual, with its PRAGMAs
+answered from those results, so what comes back is exactly what the
+regular Inspector returns.  Results are cached in the Inspector
+(info_cache) like always.  Dialects without a bulk loader in _BULK get
+a plain Inspector.
+
+    inspector = BulkInspector(engine)
+    for tname in inspector.get_table_names():
+        for column in inspector.get_columns(tname):
+            ...
+
+reflect() reflects every table (or just ``only``) into a MetaData with
+one BulkInspector, and with ``snapshot`` keeps a pickled copy of the
+result in a local file for the next start:
+
+    metadata = reflect(engine, snapshot='schema.pickle')
+
+The snapshot is used as long as the schema version it was saved with
+still matches: PRAGMA schema_version on SQLite, which changes on any DDL,
+and elsewhere the list of table names, which catches tables being added
+or dropped but not columns being altered; pass your own ``version``
+(a migration revision, say) to be exact.
+"""
+
+import os
+import pickle
+
+from sqlalchemy import MetaData, Table, util
+from sqlalchemy.engine.reflection import Inspector
+
+
+class _Rows(list):
+    """Enough of a ResultProxy for the dialect's reflection code."""
+
+    _soft_closed = False
+
+    def fetchall(self):
+        return list(self)
+
+    def scalar(self):
+        return self[0][0] if self else None
+
+
+class _BulkBind(object):
+    """Engine or Connection that answers known statements from memory.
+
+    ``load`` is called on the first statement and returns a dict of
+    {(statement, parameters): rows}; anything not in it goes to the
+    real bind.
+    """
+
+    def __init__(self, bind, load):
+        self._bind = bind
+        self._load = load
+        self._answers = None
+
+    def execute(self, statement, *multiparams, **params):
+        if isinstance(statement, util.string_types) and not params:
+            if self._answers is None:
+                self._answers = self._load(self._bind)
+            key = (statement, multiparams[0] if multiparams else None)
+            rows = self._answers.get(key)
+            if rows is not None:
+                return _Rows(rows)
+        return self._bind.execute(statement, *multiparams, **params)
+
+    def __getattr__(self, name):
+        return getattr(self._bind, name)
+
+
+_SQLITE_TABLE_SQL = (
+    "SELECT sql FROM "
+    " (SELECT * FROM sqlite_master UNION ALL "
+    "  SELECT * FROM sqlite_temp_master) "
+    "WHERE name = ? "
+    "AND type = 'table'")
+
+
+def _sqlite_bulk(bind):
+    """Every table's pragmas from a few queries, keyed like the dialect's."""
+    dialect = bind.dialect
+    quote = dialect.identifier_preparer.quote_identifier
+    answers = {}
+
+    def pragma(name, arg, rows):
+        for schema in ('main', 'temp'):
+            answers[("PRAGMA %s.%s(%s)" % (schema, name, quote(arg)),
+                     None)] = []
+        answers[("PRAGMA main.%s(%s)" % (name, quote(arg)), None)] = rows
+
+    def grouped(sql):
+        groups = {}
+        for row in bind.execute(sql):
+            groups.setdefault(row[0], []).append(tuple(row[1:]))
+        return groups
+
+    tables = bind.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table'"
+    ).fetchall()
+    info = "table_xinfo" if dialect.server_version_info >= (3, 31) \
+        else "table_info"
+    columns = grouped(
+        "SELECT m.name, p.* FROM sqlite_master AS m "
+        "JOIN pragma_%s(m.name, 'main') AS p "
+        "WHERE m.type = 'table'" % info)
+    fks = grouped(
+        "SELECT m.name, p.* FROM sqlite_master AS m "
+        "JOIN pragma_foreign_key_list(m.name, 'main') AS p "
+        "WHERE m.type = 'table'")
+    indexes = grouped(
+        "SELECT m.name, p.* FROM sqlite_master AS m "
+        "JOIN pragma_index_list(m.name, 'main') AS p "
+        "WHERE m.type = 'table'")
+    index_columns = grouped(
+        "SELECT il.name, ii.* FROM sqlite_master AS m "
+        "JOIN pragma_index_list(m.name, 'main') AS il "
+        "JOIN pragma_index_info(il.name, 'main') AS ii "
+        "WHERE m.type = 'table'")
+
+    for name, sql in tables:
+        answers[(_SQLITE_TABLE_SQL, (name,))] = [(sql,)]
+        pragma(info, name, columns.get(name, []))
+        pragma("foreign_key_list", name, fks.get(name, []))
+        pragma("index_list", name, indexes.get(name, []))
+        for index in indexes.get(name, []):
+            pragma("index_info", index[1], index_columns.get(index[1], []))
+    return answers
+
+
+def _sqlite_version(bind):
+    return bind.dialect.server_version_info >= (3, 16)
+
+
+# dialect name -> (can bulk load, bulk loader)
+_BULK = {
+    'sqlite': (_sqlite_version, _sqlite_bulk),
+}
+
+
+class BulkInspector(Inspector):
+    """Inspector that reflects all tables at once, on first use."""
+
+    def __init__(self, bind):
+        super(BulkInspector, self).__init__(bind)
+        supported, load = _BULK.get(self.dialect.name, (None, None))
+        if supported is not None and supported(self.bind):
+            self.bind = _BulkBind(self.bind, load)
+
+
+def schema_version(bind, schema=None):
+    """A value that changes when the schema does."""
+    if bind.dialect.name == 'sqlite' and schema is None:
+        return 'sqlite:%d' % bind.execute("PRAGMA schema_version").scalar()
+    inspector = Inspector.from_engine(bind)
+    return ','.join(sorted(inspector.get_table_names(schema)))
+
+
+def reflect(bind, metadata=None, schema=None, only=None, snapshot=None,
+            version=None):
+    """Reflect tables into ``metadata`` (a new MetaData by default).
+
+    With ``snapshot``, a pickled copy is loaded from that file when it's
+    still current and saved to it when it isn't.
+    """
+    if snapshot is not None:
+        if version is None:
+            version = schema_version(bind, schema)
+        key = (version, schema, sorted(only) if only is not None else None)
+        loaded = load_snapshot(snapshot, key)
+        if loaded is not None:
+            if metadata is None:
+                return loaded
+            for table in loaded.sorted_tables:
+                table.tometadata(metadata)
+            return metadata
+
+    if metadata is None:
+        metadata = MetaData()
+    inspector = BulkInspector(bind)
+    names = inspector.get_table_names(schema)
+    if only is not None:
+        names = [name for name in names if name in only]
+
+    # create them all first, so that foreign keys find the tables they
+    # refer to already there instead of autoloading them one at a time
+    tables = []
+    for name in names:
+        fullname = name if schema is None else '%s.%s' % (schema, name)
+        if fullname not in metadata.tables:
+            tables.append(Table(name, metadata, schema=schema))
+    for table in tables:
+        inspector.reflecttable(table, None)
+
+    if snapshot is not None:
+        save_snapshot(snapshot, key, metadata)
+    return metadata
+
+
+def save_snapshot(path, key, metadata):
+    """Write ``metadata`` to ``path``, tagged with ``key``."""
+    tmp = '%s.%d' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, metadata), f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_snapshot(path, key):
+    """The MetaData saved at ``path`` if it was tagged with ``key``."""
+    try:
+        with open(path, 'rb') as f:
+            saved_key, metadata = pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if saved_key != key:
+        return None
+    return metadata
@@ -0,0 +1,91 @@
+__author__ = 'davis'
+"""
+Bulk save of new objects.
+
+    session.add_all([User(...), User(...), ...])
+    session.commit()
+
+runs every object through the unit of work: cascades, attribute
+history, per-object flush events, and a SELECT-free but per-row
+INSERT whenever primary keys have to be fetched.  For a large list of
+plain new objects none of that is needed.  bulk_add_all() hands such
+objects to Session.bulk_save_objects(), which emits one executemany()
+INSERT per class, and only sends the rest through add_all().
+
+New objects that another, non-eligible object refers to go through
+add_all() too, since its cascade would add them anyway.
+
+Bulk saved objects are *not* added to the Session and don't receive
+their primary key unless return_defaults=True, which costs an INSERT
+per row on most backends.
+"""
+
+from sqlalchemy import inspect
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def bulk_eligible(obj):
+    """True if ``obj`` is new and carries no related objects.
+
+    Objects that are already persistent, or that have relationship
+    attributes populated (pending Address objects on a User, say), need
+    the full unit of work and aren't eligible.
+    """
+    state = inspect(obj)
+    if not state.transient:
+        return False
+    for prop in state.mapper.relationships:
+        value = state.dict.get(prop.key)
+        if value:
+            return False
+    return True
+
+
+def bulk_add_all(session, objects, return_defaults=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+    """Bulk INSERT eligible ``objects``; add_all() the others.
+
+    Objects are saved ``chunk_size`` at a time, grouped by class within
+    each chunk.  Returns (bulk saved, added) counts.
+    """
+    eligible = []
+    regular = []
+    for obj in objects:
+        if bulk_eligible(obj):
+            eligible.append(obj)
+        else:
+            regular.append(obj)
+
+    # add_all() cascades to whatever the regular objects refer to, such
+    # as the User of a new Address(user=user) with no backref; those
+    # would be INSERTed a second time if they went out in bulk as well
+    referenced = set()
+    for obj in regular:
+        state = inspect(obj)
+        for related, mapper, related_state, dict_ in \
+                state.mapper.cascade_iterator('save-update', state):
+            referenced.add(related_state)
+
+    bulk = []
+    saved = 0
+
+    def flush_chunk():
+        # preserve_order=False lets each class go out as one executemany()
+        session.bulk_save_objects(bulk, return_defaults=return_defaults,
+                                  preserve_order=False)
+        del bulk[:]
+
+    for obj in eligible:
+        if inspect(obj) in referenced:
+            regular.append(obj)
+            continue
+        bulk.append(obj)
+        saved += 1
+        if len(bulk) >= chunk_size:
+            flush_chunk()
+    if bulk:
+        flush_chunk()
+
+    session.add_all(regular)
+    return saved, len(regular)
@@ -0,0 +1,132 @@
+__author__ = 'davis'
+"""
+Column-oriented fetching.
+
+For analytics, the result of something like
+
+    select([user_table.c.id, user_table.c.username, user_table.c.score])
+
+usually gets turned around into one list or array per column, row by
+row:
+
+    rows = result.fetchall()
+    ids = numpy.array([row['id'] for row in rows])
+
+fetch_columns() does that straight from the cursor, a batch at a time:
+each batch of raw DBAPI rows is split up with itemgetter(), the column's
+result processor (if its type has one) is mapped over the whole column,
+and the values are appended to an array.array in one extend() call.  No
+RowProxy is made.
+
+    columns = fetch_columns(conn.execute(stmt))
+    columns['score']        # array('d', [...])
+    columns['username']     # ['ed', 'wendy', ...]
+
+The typecode comes from the first batch: int columns become 'q', float
+'d' and bool 'b'.  Anything else - strings, dates, Decimal - stays a list.
+A column that turns out to have a NULL, a value too big for 64 bits or
+a value of another type is switched to a list from there on.
+
+fetch_arrays() returns NumPy arrays instead, made from the array.array
+buffers without copying; list columns become object arrays.  NumPy is
+optional and only needed for fetch_arrays().
+"""
+
+from array import array
+from collections import OrderedDict
+from operator import itemgetter
+
+from sqlalchemy import util
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_BATCH_SIZE = 10000
+
+try:
+    array('q')
+    _INT = 'q'
+except ValueError:
+    # Python 2 has no 'q'
+    _INT = 'l'
+
+_NUMPY_TYPES = {_INT: 'int64', 'd': 'float64', 'b': 'bool'}
+
+
+def _typecode(values):
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return 'b'
+        if isinstance(value, util.int_types):
+            return _INT
+        if isinstance(value, float):
+            return 'd'
+        return None
+    return None
+
+
+def _extend(column, values):
+    """Append ``values``; return the column, a list if it had to be."""
+    if isinstance(column, array):
+        size = len(column)
+        try:
+            column.extend(values)
+            return column
+        except (TypeError, OverflowError):
+            del column[size:]
+            column = column.tolist()
+    column.extend(values)
+    return column
+
+
+def fetch_columns(result, batch_size=DEFAULT_BATCH_SIZE):
+    """Fetch the rest of ``result`` as an OrderedDict of columns."""
+    keys = result.keys()
+    processors = result._metadata._processors
+    getters = [itemgetter(index) for index in range(len(keys))]
+    columns = None
+    try:
+        while True:
+            rows = result._fetchmany_impl(batch_size)
+            if not rows:
+                break
+            batch = []
+            for getter, processor in zip(getters, processors):
+                values = map(getter, rows)
+                if processor is not None:
+                    values = map(processor, values)
+                batch.append(list(values))
+            if columns is None:
+                columns = []
+                for values in batch:
+                    code = _typecode(values)
+                    columns.append(array(code) if code else [])
+            for index, values in enumerate(batch):
+                columns[index] = _extend(columns[index], values)
+        result._soft_close()
+    except BaseException as e:
+        result.connection._handle_dbapi_exception(
+            e, None, None, result.cursor, result.context)
+    if columns is None:
+        columns = [[] for key in keys]
+    return OrderedDict(zip(keys, columns))
+
+
+def fetch_arrays(result, batch_size=DEFAULT_BATCH_SIZE):
+    """Fetch the rest of ``result`` as an OrderedDict of NumPy arrays."""
+    if numpy is None:
+        raise ImportError("fetch_arrays() requires numpy")
+    arrays = OrderedDict()
+    for key, column in fetch_columns(result, batch_size).items():
+        if isinstance(column, array):
+            arrays[key] = numpy.frombuffer(
+                column, dtype=_NUMPY_TYPES[column.typecode])
+        else:
+            values = numpy.empty(len(column), dtype=object)
+            values[:] = column
+            arrays[key] = values
+    return arrays
@@ -0,0 +1,135 @@
+__author__ = 'davis'
+"""
+Less reloading after commit.
+
+Slide 18: after session.commit() "the Session invalidates all data", so
+touching ed_user.fullname emits a SELECT - one per object, for every
+object the worker still holds.  Two ways out:
+
+keep_flushed_on_commit(session)
+    Objects flushed in the transaction keep their values through the
+    commit; they hold exactly what was just written.  Everything else
+    is expired as usual.  Attributes the database generates (server
+    defaults, onupdate SQL expressions) are expired by the flush itself
+    and still load on access.  Takes a Session or a sessionmaker; a
+    Session class can't be given expire_on_commit=False for all its
+    instances, so it's refused.
+
+batch_refresh_on_commit(session, batch_size=500)
+    Everything is expired as usual, but when the first expired object
+    of a class is touched, up to batch_size expired objects of that
+    class are refreshed with one "WHERE id IN (...)" SELECT.  Takes a
+    Session, a sessionmaker or a Session class.
+
+A rollback always expires everything, in both modes.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.orm.session import _state_session, sessionmaker
+
+DEFAULT_BATCH_SIZE = 500
+
+_FLUSHED = 'commit_refresh_flushed'
+_PENDING = 'commit_refresh_pending'
+_BATCH_SIZE = 'commit_refresh_batch_size'
+
+
+def keep_flushed_on_commit(session):
+    """Don't expire objects flushed in the committed transaction."""
+    if isinstance(session, sessionmaker):
+        session.configure(expire_on_commit=False)
+    elif isinstance(session, type):
+        # Session.__init__ sets expire_on_commit on every instance
+        raise TypeError(
+            "keep_flushed_on_commit() takes a Session or a sessionmaker, "
+            "not the class %s" % session.__name__)
+    else:
+        session.expire_on_commit = False
+    event.listen(session, 'after_flush', _record_flushed)
+    event.listen(session, 'after_commit', _expire_unflushed)
+    event.listen(session, 'after_rollback', _forget_flushed)
+
+
+def _record_flushed(session, flush_context):
+    flushed = session.info.setdefault(_FLUSHED, set())
+    for obj in session.new:
+        flushed.add(instance_state(obj))
+    for obj in session.dirty:
+        flushed.add(instance_state(obj))
+
+
+def _expire_unflushed(session):
+    flushed = session.info.pop(_FLUSHED, ())
+    for state in list(session.identity_map.all_states()):
+        if state not in flushed:
+            state._expire(state.dict, session.identity_map._modified)
+
+
+def _forget_flushed(session):
+    session.info.pop(_FLUSHED, None)
+
+
+def batch_refresh_on_commit(session, batch_size=DEFAULT_BATCH_SIZE):
+    """Refresh expired objects of a class batch_size at a time."""
+    def collect_expired(session):
+        # a sessionmaker or Session class has no info of its own
+        session.info[_BATCH_SIZE] = batch_size
+        _collect_expired(session)
+    event.listen(session, 'after_commit', collect_expired)
+
+
+def _collect_expired(session):
+    pending = {}
+    for state in session.identity_map.all_states():
+        mapper = state.manager.mapper
+        _install_batch_loader(mapper)
+        pending.setdefault(mapper, []).append(state)
+    session.info[_PENDING] = pending
+
+
+def _install_batch_loader(mapper):
+    manager = mapper.class_manager
+    original = manager.deferred_scalar_loader
+    if getattr(original, 'batch_refresh', False):
+        return
+
+    def load_expired(state, attribute_names):
+        _load_batch(mapper, original, state, attribute_names)
+    load_expired.batch_refresh = True
+    manager.deferred_scalar_loader = load_expired
+
+
+def _refreshable(state, session_id):
+    return state.key is not None and state.session_id == session_id and \
+        not state.modified and bool(state.expired_attributes) and \
+        state.obj() is not None
+
+
+def _load_batch(mapper, original, state, attribute_names):
+    session = _state_session(state)
+    pending = None
+    if session is not None:
+        pending = session.info.get(_PENDING, {}).get(mapper)
+    pk_cols = mapper.primary_key
+    if not pending or state.key is None or len(pk_cols) != 1:
+        return original(state, attribute_names)
+
+    batch_size = session.info.get(_BATCH_SIZE, DEFAULT_BATCH_SIZE)
+    idents = [state.key[1][0]]
+    while pending and len(idents) < batch_size:
+        other = pending.pop()
+        if other is not state and _refreshable(other, state.session_id):
+            idents.append(other.key[1][0])
+    if len(idents) == 1:
+        return original(state, attribute_names)
+
+    # existing objects with expired attributes get those attributes
+    # populated from the rows; nothing else is touched
+    q = session.query(mapper).autoflush(False).filter(pk_cols[0].in_(idents))
+    list(q)
+
+    if state.expired_attributes.intersection(attribute_names):
+        # row is gone, or wasn't refreshed; let the normal loader deal
+        # with it (and raise ObjectDeletedError if need be)
+        return original(state, attribute_names)
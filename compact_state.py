@@ -0,0 +1,127 @@
+__author__ = 'davis'
+"""
+Compact instance state for read-heavy mapped classes.
+
+Every loaded User carries an InstanceState, and every InstanceState
+starts life with its own ``committed_state`` dict and
+``expired_attributes`` set, plus per-instance references to its class
+and ClassManager.  For an object that is loaded, read and thrown away
+those containers stay empty the whole time.
+
+compact() switches a mapped class over to CompactInstanceState, which
+
+* keeps ``class_`` and ``manager`` on a per-class subclass instead of
+  in every state's __dict__,
+* creates ``committed_state`` / ``expired_attributes`` only when
+  something actually touches them, and
+* doesn't create them at all when the object is loaded or refreshed
+  from a row.
+
+History, expiry and flushes work as before.  Nothing outside the
+compacted class is touched, which has one cost: after a flush or merge
+the Session commits states through InstanceState._commit_all_states()
+on the base class, and that allocates both containers for every object
+it flushed.  Objects that are only loaded and read stay compact.
+
+    @compact
+    class User(Base):
+        __tablename__ = 'user'
+        ...
+"""
+
+import weakref
+
+from sqlalchemy.orm import instrumentation
+from sqlalchemy.orm.state import InstanceState
+
+
+class _created_on_access(object):
+    """Non-data descriptor creating an empty container on first use."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+
+    def __get__(self, state, owner):
+        if state is None:
+            return self
+        value = state.__dict__[self.name] = self.factory()
+        return value
+
+
+class CompactInstanceState(InstanceState):
+    """InstanceState that allocates its bookkeeping containers lazily."""
+
+    committed_state = _created_on_access('committed_state', dict)
+    expired_attributes = _created_on_access('expired_attributes', set)
+
+    def __init__(self, obj, manager):
+        # class_ and manager are class attributes of the per-class
+        # subclass built by compact()
+        self.obj = weakref.ref(obj, self._cleanup)
+
+    def __reduce_ex__(self, protocol):
+        # the per-class subclasses can't be found by name, unpickle as
+        # a plain CompactInstanceState; __setstate__ restores class_
+        return _unpickle_state, (), self.__getstate__()
+
+    @classmethod
+    def _commit_all_states(cls, iter_, instance_dict=None):
+        """InstanceState._commit_all_states() that leaves the containers
+        unallocated; reached through state._commit_all(), e.g. on load
+        and refresh.
+        """
+        for state, dict_ in iter_:
+            state_dict = state.__dict__
+            state_dict.pop('committed_state', None)
+            expired = state_dict.get('expired_attributes')
+            if expired is not None:
+                expired.difference_update(dict_)
+                if not expired:
+                    del state_dict['expired_attributes']
+
+            if '_pending_mutations' in state_dict:
+                del state_dict['_pending_mutations']
+
+            if instance_dict and state.modified:
+                instance_dict._modified.discard(state)
+
+            state.modified = state.expired = False
+            state._strong_obj = None
+
+
+def _unpickle_state():
+    return CompactInstanceState.__new__(CompactInstanceState)
+
+
+def compact(cls):
+    """Class decorator: use CompactInstanceState for mapped ``cls``."""
+    manager = instrumentation.manager_of_class(cls)
+    if manager is None:
+        raise TypeError("%s is not a mapped class" % cls.__name__)
+
+    state_cls = type('Compact%sState' % cls.__name__,
+                     (CompactInstanceState,),
+                     {'class_': cls, 'manager': manager})
+
+    if '_state_constructor' in manager.__dict__:
+        manager._state_constructor = state_cls
+        return cls
+
+    def first_state(instance, manager):
+        # the first instance is where ClassManager fires first_init,
+        # which is what configures the mappers
+        manager.dispatch.first_init(manager, manager.class_)
+        manager._state_constructor = state_cls
+        return state_cls(instance, manager)
+
+    manager._state_constructor = first_state
+    return cls
+
+
+def is_compact(cls):
+    manager = instrumentation.manager_of_class(cls)
+    constructor = manager.__dict__.get('_state_constructor')
+    return constructor is not None and (
+        not isinstance(constructor, type) or
+        issubclass(constructor, CompactInstanceState))
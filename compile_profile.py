@@ -0,0 +1,206 @@
+__author__ = 'davis'
+"""
+Offline compile benchmarks.
+
+The statements from presentation-3.py are compiled against the sqlite,
+mysql and postgresql dialects without connecting to anything, so
+compile time and memory allocated per compile can be tracked over time
+and compared against a saved baseline.
+
+Allocation counts use tracemalloc when it is available (python 3.4+);
+otherwise they are reported as None.  They're what a compile allocates
+and still holds when it returns, plus the peak it allocated on the way,
+not what stays in memory once the Compiled is thrown away.
+"""
+
+import cProfile
+import json
+import pstats
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.dialects import sqlite, mysql, postgresql
+
+metadata = MetaData()
+user_table = Table('user', metadata,
+                   Column('id', Integer, primary_key=True),
+                   Column('username', String(50)),
+                   Column('fullname', String)
+                   )
+address_table = Table('address', metadata,
+                      Column('id', Integer, primary_key=True),
+                      Column('user_id', Integer, ForeignKey('user.id'),
+                             nullable=False),
+                      Column('email_address', String(100), nullable=False)
+                      )
+
+DIALECTS = [
+    ('sqlite', sqlite.dialect()),
+    ('mysql', mysql.dialect()),
+    ('postgresql', postgresql.dialect()),
+]
+
+
+def corpus():
+    """(name, statement) pairs covering the presentation-3.py constructs."""
+    address_subq = select([
+        address_table.c.user_id,
+        func.count(address_table.c.id).label('count')
+    ]).group_by(address_table.c.user_id).alias()
+
+    address_sel = select([func.count(address_table.c.id)]).\
+        where(user_table.c.id == address_table.c.user_id)
+
+    return [
+        ('simple_where',
+         select([user_table]).where(user_table.c.username == 'ed')),
+        ('and_or',
+         select([user_table]).where(
+             and_(user_table.c.fullname == 'ed jones',
+                  or_(user_table.c.username == 'ed',
+                      user_table.c.username == 'jack')))),
+        ('in_order_by',
+         select([user_table]).
+         where(user_table.c.username.in_(['wendy', 'mary', 'ed'])).
+         order_by(user_table.c.username)),
+        ('join',
+         select([user_table, address_table]).select_from(
+             user_table.join(address_table,
+                             user_table.c.id == address_table.c.user_id))),
+        ('group_by_subquery',
+         select([user_table.c.username, address_subq.c.count]).
+         select_from(user_table.join(address_subq)).
+         order_by(user_table.c.username)),
+        ('correlated_scalar',
+         select([user_table.c.username, address_sel.as_scalar()])),
+        ('insert', user_table.insert().values(username='ed',
+                                              fullname='Ed Jones')),
+        ('update_expression',
+         user_table.update().values(
+             fullname=user_table.c.username + " " + user_table.c.fullname)),
+        ('update_where',
+         address_table.update().
+         values(email_address="jack@msn.com").
+         where(address_table.c.email_address == "jack@yahoo.com")),
+        ('delete',
+         address_table.delete().
+         where(address_table.c.email_address == "ed@ed.com")),
+    ]
+
+
+def time_compile(statement, dialect, number=200, repeat=3):
+    """Best-of-``repeat`` seconds for a single compile."""
+    best = None
+    for r in range(repeat):
+        start = time.time()
+        for i in range(number):
+            statement.compile(dialect=dialect)
+        elapsed = (time.time() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def allocations(statement, dialect):
+    """(blocks, bytes, peak bytes) allocated by one compile.
+
+    ``blocks`` and ``bytes`` count what the compile allocated and was
+    still using when it returned - the Compiled and everything it
+    refers to, plus anything cached along the way - ``peak bytes`` the
+    most memory it had allocated at any one time, temporaries included.
+    Peak bytes is None when tracemalloc was already tracing on a python
+    without tracemalloc.reset_peak() (before 3.9).
+    """
+    if tracemalloc is None:
+        return None, None, None
+    started = tracemalloc.is_tracing()
+    if not started:
+        # starting afresh also starts the peak afresh
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        reset_peak = getattr(tracemalloc, 'reset_peak', None)
+        if reset_peak is not None:
+            reset_peak()
+        traced, peak = tracemalloc.get_traced_memory()
+        compiled = statement.compile(dialect=dialect)
+        current, peak = tracemalloc.get_traced_memory()
+        # the Compiled is still alive here, so what it holds shows up
+        # as allocated
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not started:
+            tracemalloc.stop()
+    if started and reset_peak is None:
+        peak = None
+    else:
+        peak -= traced
+    stats = after.compare_to(before, 'filename')
+    del compiled
+    return (sum(s.count_diff for s in stats if s.count_diff > 0),
+            sum(s.size_diff for s in stats if s.size_diff > 0),
+            peak)
+
+
+def run(number=200):
+    """Compile every corpus statement with every dialect.
+
+    Returns a list of dictionaries with keys statement, dialect, usec,
+    alloc_blocks, alloc_bytes and peak_bytes (see allocations()).
+    """
+    results = []
+    for name, statement in corpus():
+        for dialect_name, dialect in DIALECTS:
+            # first compile warms up the per-dialect caches
+            statement.compile(dialect=dialect)
+            blocks, nbytes, peak = allocations(statement, dialect)
+            results.append({
+                'statement': name,
+                'dialect': dialect_name,
+                'usec': time_compile(statement, dialect, number) * 1e6,
+                'alloc_blocks': blocks,
+                'alloc_bytes': nbytes,
+                'peak_bytes': peak,
+            })
+    return results
+
+
+def save(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+def load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def regressions(results, baseline, tolerance=0.25):
+    """Entries whose compile time grew by more than ``tolerance``.
+
+    Yields (result, baseline usec) pairs.
+    """
+    previous = dict(((b['statement'], b['dialect']), b['usec'])
+                    for b in baseline)
+    for result in results:
+        before = previous.get((result['statement'], result['dialect']))
+        if before and result['usec'] > before * (1 + tolerance):
+            yield result, before
+
+
+def profile(name, dialect_name, number=1000, limit=20):
+    """Print cProfile output for compiling one corpus statement."""
+    statement = dict(corpus())[name]
+    dialect = dict(DIALECTS)[dialect_name]
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for i in range(number):
+        statement.compile(dialect=dialect)
+    profiler.disable()
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
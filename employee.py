@@ -0,0 +1,43 @@
+__author__ = 'davis'
+"""
+The employee / employee_of_month tables used by presentation-1.py,
+described with Table objects so the helper modules can share them.
+"""
+
+from sqlalchemy import MetaData
+from sqlalchemy import Table, Column
+from sqlalchemy import Integer, String
+
+metadata = MetaData()
+
+#     CREATE TABLE employee (
+#         emp_id INTEGER PRIMARY KEY,
+#         emp_name VARCHAR(30)
+#     )
+employee_table = Table('employee', metadata,
+                       Column('emp_id', Integer, primary_key=True),
+                       Column('emp_name', String(30))
+                       )
+
+employee_of_month_table = Table('employee_of_month', metadata,
+                                Column('emp_name', String(30))
+                                )
+
+
+def generate_employees(count, start=1):
+    """Produce ``count`` employee rows as dictionaries."""
+    for emp_id in range(start, start + count):
+        yield {'emp_id': emp_id, 'emp_name': 'emp %d' % emp_id}
+
+
+def populate(engine, count, chunk=10000):
+    """Drop, create and fill the employee table with ``count`` rows."""
+    employee_table.drop(engine, checkfirst=True)
+    metadata.create_all(engine)
+    rows = generate_employees(count)
+    with engine.begin() as conn:
+        while True:
+            batch = [row for _, row in zip(range(chunk), rows)]
+            if not batch:
+                break
+            conn.execute(employee_table.insert(), batch)
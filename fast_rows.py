@@ -0,0 +1,178 @@
+__author__ = 'davis'
+"""
+Tuple-backed result rows.
+
+presentation-1.py reads rows as row['emp_name'], row['emp_id'] and
+row.emp_id.  A RowProxy keeps a reference to its result's metadata and
+goes through it for every one of those lookups.  Here the rows of a
+result are instances of a tuple subclass made for that result: the
+key -> index map is worked out once, kept on the class and shared by
+every row, and each column name is also a property reading straight out
+of the tuple.
+
+    result = conn.execute(select([employee_table]))
+    for row in fetchall(result):
+        print(row['emp_name'], row.emp_id, row[0])
+
+Building the rows and row.emp_id are quicker than with RowProxy.
+row['emp_name'] is a Python-level lookup, so it's quicker than the pure
+Python RowProxy but not the C extension's; code that reads many columns
+by name should prefer attributes.
+
+Rows are plain tuples underneath, so they compare, hash, pickle (as
+tuples) and unpack like tuples, and are immutable.  A column named
+count or index - func.count().label('count'), say - is row.count as
+with RowProxy, hiding the tuple method of that name; when there's no
+such column, row.count is tuple.count where RowProxy would raise
+AttributeError.  Names of FastRow's own methods (keys, values, items,
+has_key) stay methods, as on RowProxy, and are read with row['keys'].
+Keys are whatever the result accepts - names, Column objects, integer
+positions - except ambiguous names, which raise InvalidRequestError as
+they do with RowProxy.
+"""
+
+import re
+from keyword import iskeyword
+from operator import itemgetter
+
+from sqlalchemy import exc, util
+
+try:
+    # what namedtuple uses for its fields; a lot quicker than
+    # property(itemgetter(i))
+    from collections import _tuplegetter
+except ImportError:
+    _tuplegetter = None
+
+_identifier = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# RowProxy isn't a tuple, so row.count is the column there, not the
+# tuple method; a column by one of these names hides the method here too
+_TUPLE_METHODS = ('count', 'index')
+
+
+class FastRow(tuple):
+    """Base class of the per-result row classes."""
+
+    __slots__ = ()
+
+    _keymap = {}
+    _keys = ()
+
+    def __getitem__(self, key):
+        try:
+            index = self._keymap[key]
+        except KeyError:
+            if isinstance(key, slice):
+                return tuple.__getitem__(self, key)
+            raise exc.NoSuchColumnError(
+                "Could not locate column in row for column '%s'" % (key,))
+        except TypeError:
+            # slices aren't hashable before Python 3.12
+            return tuple.__getitem__(self, key)
+        if index is None:
+            raise exc.InvalidRequestError(
+                "Ambiguous column name '%s' in result set column "
+                "descriptions" % (key,))
+        return tuple.__getitem__(self, index)
+
+    def __contains__(self, key):
+        return key in self._keymap
+
+    def has_key(self, key):
+        return key in self._keymap
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return list(zip(self._keys, self))
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+    def __reduce__(self):
+        # the class only exists for one result; unpickle as a tuple
+        return tuple, (tuple(self),)
+
+
+def row_class(result):
+    """Make the row class for ``result``'s columns."""
+    keymap = {}
+    for key, (processor, obj, index) in result._metadata._keymap.items():
+        keymap[key] = index
+    count = len(result._metadata.keys)
+    for index in range(count):
+        keymap[index] = index
+        keymap[index - count] = index
+
+    attrs = {'__slots__': (), '_keymap': keymap,
+             '_keys': tuple(result._metadata.keys)}
+    for key, index in keymap.items():
+        if isinstance(key, util.string_types) and index is not None and \
+                _identifier.match(key) and not iskeyword(key) and \
+                (key in _TUPLE_METHODS or not hasattr(FastRow, key)):
+            if _tuplegetter is not None:
+                attrs[key] = _tuplegetter(index, None)
+            else:
+                attrs[key] = property(itemgetter(index))
+    return type('FastRow', (FastRow,), attrs)
+
+
+def _rows(cls, result, raw):
+    processors = result._metadata._processors
+    if not any(processors):
+        return list(map(cls, raw))
+    pairs = [(index, processor) for index, processor in
+             enumerate(processors) if processor is not None]
+    rows = []
+    for row in raw:
+        row = list(row)
+        for index, processor in pairs:
+            row[index] = processor(row[index])
+        rows.append(cls(row))
+    return rows
+
+
+def fetchall(result):
+    """Like result.fetchall(), returning FastRow rows."""
+    try:
+        rows = _rows(row_class(result), result, result._fetchall_impl())
+        result._soft_close()
+        return rows
+    except BaseException as e:
+        result.connection._handle_dbapi_exception(
+            e, None, None, result.cursor, result.context)
+
+
+def _fetchmany(result, cls, size):
+    try:
+        rows = _rows(cls, result, result._fetchmany_impl(size))
+        if len(rows) == 0:
+            result._soft_close()
+        return rows
+    except BaseException as e:
+        result.connection._handle_dbapi_exception(
+            e, None, None, result.cursor, result.context)
+
+
+def fetchmany(result, size):
+    """Like result.fetchmany(), returning FastRow rows."""
+    return _fetchmany(result, row_class(result), size)
+
+
+def iterate(result, size=1000):
+    """Iterate ``result`` as FastRow rows, ``size`` rows per fetch.
+
+    All the rows share one row class.
+    """
+    cls = row_class(result)
+    while True:
+        rows = _fetchmany(result, cls, size)
+        if not rows:
+            return
+        for row in rows:
+            yield row
@@ -0,0 +1,101 @@
+__author__ = 'davis'
+"""
+What the identity map is holding on to.
+
+The Session keeps a *unique* object per identity (ed_user is our_user),
+but it only references clean objects weakly: once nothing else points
+at a loaded User it drops out of session.identity_map.  Objects with
+pending changes are held strongly (state._strong_obj) until the next
+flush, and new objects are held by session.new.
+
+Two things still make a long batch job grow without limit:
+
+* keeping references to every object, e.g. query.all() or
+  ``for user in session.query(User)`` - without yield_per() the Query
+  builds every object of the result before the loop sees the first one.
+* objects modified but never flushed.
+
+identity_map_report() shows how many objects of each class are in the
+map, how many are strongly held and roughly how many bytes they use;
+iterate() walks a large query without retaining it.
+"""
+
+import sys
+from collections import namedtuple
+
+from sqlalchemy import inspect
+
+DEFAULT_YIELD_PER = 1000
+
+
+class ClassStats(namedtuple('ClassStats',
+                            ['name', 'count', 'strong', 'bytes'])):
+    """Identity map totals for one mapped class."""
+
+    @property
+    def bytes_per_object(self):
+        return self.bytes // self.count if self.count else 0
+
+
+def _sizeof(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+        for value in obj.__dict__.values():
+            # only count flat values; related objects are counted
+            # as objects of their own class
+            if isinstance(value, (str, bytes, int, float)):
+                size += sys.getsizeof(value)
+    return size
+
+
+def estimate_bytes(obj):
+    """Rough size of a mapped object plus its InstanceState."""
+    state = inspect(obj)
+    size = _sizeof(obj) + sys.getsizeof(state)
+    for name in ('committed_state', 'callables', 'expired_attributes',
+                 'parents'):
+        value = state.__dict__.get(name)
+        if value:
+            size += sys.getsizeof(value)
+    return size
+
+
+def identity_map_report(session):
+    """A ClassStats per mapped class present in the identity map."""
+    totals = {}
+    for state in list(session.identity_map.all_states()):
+        obj = state.obj()
+        if obj is None:
+            continue
+        name = state.class_.__name__
+        count, strong, nbytes = totals.get(name, (0, 0, 0))
+        totals[name] = (count + 1,
+                        strong + (state._strong_obj is not None),
+                        nbytes + estimate_bytes(obj))
+    return [ClassStats(name, count, strong, nbytes)
+            for name, (count, strong, nbytes) in sorted(totals.items())]
+
+
+def format_report(session):
+    lines = ["%-20s %10s %10s %12s %8s" % (
+        'class', 'objects', 'strong', 'bytes', 'per obj')]
+    for stats in identity_map_report(session):
+        lines.append("%-20s %10d %10d %12d %8d" % (
+            stats.name, stats.count, stats.strong, stats.bytes,
+            stats.bytes_per_object))
+    lines.append("new: %d  dirty: %d" % (len(session.new),
+                                         len(session.dirty)))
+    return "\n".join(lines)
+
+
+def iterate(query, yield_per=DEFAULT_YIELD_PER):
+    """Iterate ``query`` holding at most about ``yield_per`` rows.
+
+    Objects the caller doesn't keep are released from the identity map
+    as soon as the loop moves past them.  yield_per() doesn't mix with
+    joined / subquery eager loading of collections; use lazy or
+    chunkload() loading for those.
+    """
+    for obj in query.yield_per(yield_per):
+        yield obj
@@ -0,0 +1,188 @@
+__author__ = 'davis'
+"""
+Keyset ("seek") pagination.
+
+presentation-4.py pages with slices:
+
+    session.query(User).order_by(User.id)[1:3]
+
+which is LIMIT/OFFSET; the database still reads and throws away every
+row before the offset, so page 10000 costs 10000 times page 1.  Keyset
+pagination remembers the ORDER BY values of the last row on a page and
+asks for the rows after it instead:
+
+    SELECT ... FROM user WHERE user.id > :last ORDER BY user.id LIMIT :n
+
+which with an index on the ORDER BY columns costs the same on every page.
+
+    query = session.query(User).order_by(User.name, User.id)
+    page = keyset_page(query, 50)
+    while page.token is not None:
+        page = keyset_page(query, 50, page.token)
+
+page.token is an opaque string to hand back to a client ("next page"
+links); it's base64'd JSON, so it can't do anything but fail to decode
+if it's tampered with.  The query's primary key is added to the ORDER BY
+if it isn't there already, so that rows with equal values are never
+skipped or repeated.  ORDER BY columns may be desc(), but may not
+contain NULLs, since NULL > :last is never true.
+
+KeysetQuery makes it a Query method:
+
+    session = Session(bind=engine, query_cls=KeysetQuery)
+    page = session.query(User).order_by(User.id).keyset_page(50)
+"""
+
+import base64
+import collections
+import datetime
+import decimal
+import json
+
+from sqlalchemy import and_, or_, util
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+
+class Page(collections.namedtuple('Page', ['items', 'token'])):
+    """One page of results; ``token`` is None on the last page."""
+
+    __slots__ = ()
+
+    @property
+    def has_more(self):
+        return self.token is not None
+
+
+def _ordering(query):
+    """Return [(column, descending)], ending in the primary key."""
+    ordering = []
+    for clause in query._order_by or ():
+        if isinstance(clause, UnaryExpression) and \
+                clause.modifier in (operators.desc_op, operators.asc_op):
+            ordering.append((clause.element,
+                             clause.modifier is operators.desc_op))
+        else:
+            ordering.append((clause, False))
+
+    mapper = query._mapper_zero() if query._entities else None
+    if mapper is not None:
+        for pk in mapper.primary_key:
+            if not any(pk in column.proxy_set for column, desc in ordering):
+                ordering.append((pk, False))
+    if not ordering:
+        raise ValueError("keyset pagination needs an ORDER BY")
+    return ordering
+
+
+def _after(ordering, values):
+    """WHERE criteria for the rows after ``values``."""
+    clauses = []
+    for i, (column, desc) in enumerate(ordering):
+        op = operators.lt if desc else operators.gt
+        equal = [c == v for (c, d), v in zip(ordering[:i], values)]
+        clauses.append(and_(*(equal + [op(column, values[i])])))
+    column, desc = ordering[0]
+    # the leading column alone, so the index can be used to seek
+    start = column <= values[0] if desc else column >= values[0]
+    return and_(start, or_(*clauses))
+
+
+def _signature(ordering):
+    return ','.join('%s%s' % (column, ' DESC' if desc else '')
+                    for column, desc in ordering)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'d': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {'dec': str(value)}
+    if value is None:
+        raise ValueError("keyset pagination can't continue from a NULL")
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            text = value['dt']
+            fmt = '%Y-%m-%dT%H:%M:%S.%f' if '.' in text \
+                else '%Y-%m-%dT%H:%M:%S'
+            return datetime.datetime.strptime(text, fmt)
+        if 'd' in value:
+            return datetime.datetime.strptime(value['d'], '%Y-%m-%d').date()
+        if 'dec' in value:
+            return decimal.Decimal(value['dec'])
+    return value
+
+
+def encode_token(ordering, values):
+    data = json.dumps([_signature(ordering),
+                       [_encode_value(v) for v in values]])
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_token(ordering, token):
+    try:
+        signature, values = json.loads(
+            base64.urlsafe_b64decode(str(token)).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise ValueError("invalid continuation token")
+    if signature != _signature(ordering) or len(values) != len(ordering):
+        raise ValueError("continuation token is for a different ORDER BY")
+    return [_decode_value(v) for v in values]
+
+
+def keyset_page(query, size, token=None):
+    """Return the Page of ``query`` after ``token``, or the first one."""
+    ordering = _ordering(query)
+    columns = [column for column, desc in ordering]
+    q = query.order_by(None).order_by(
+        *[column.desc() if desc else column for column, desc in ordering])
+    if token is not None:
+        q = q.filter(_after(ordering, decode_token(ordering, token)))
+
+    # the ORDER BY values ride along as extra columns and are
+    # taken off again below
+    width = len(query._entities)
+    single = not query._only_return_tuples and width == 1 and \
+        query._entities[0].supports_single_entity
+    rows = q.add_columns(*columns).limit(size + 1).all()
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if single:
+        items = [row[0] for row in rows]
+    else:
+        keyed_tuple = util.lightweight_named_tuple(
+            'result', [entity._label_name for entity in query._entities])
+        items = [keyed_tuple(row[:width]) for row in rows]
+    token = None
+    if more:
+        token = encode_token(ordering, list(rows[-1][width:]))
+    return Page(items, token)
+
+
+def keyset_pages(query, size):
+    """Iterate every Page of ``query``."""
+    token = None
+    while True:
+        page = keyset_page(query, size, token)
+        yield page
+        if page.token is None:
+            return
+        token = page.token
+
+
+class KeysetQuery(Query):
+    """Query with keyset_page() and keyset_pages() methods."""
+
+    def keyset_page(self, size, token=None):
+        return keyset_page(self, size, token)
+
+    def keyset_pages(self, size):
+        return keyset_pages(self, size)
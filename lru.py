@@ -0,0 +1,62 @@
+__author__ = 'davis'
+"""
+A small thread safe least-recently-used mapping with hit / miss
+counters, shared by the caching helpers.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Mapping that holds at most ``capacity`` entries.
+
+    The least recently read or written entry is discarded first.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return "%d entries, %d hits, %d misses" % (
+            len(self), self.hits, self.misses)
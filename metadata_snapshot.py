@@ -0,0 +1,74 @@
+__author__ = 'davis'
+"""
+MetaData snapshots for faster startup.
+
+presentation-2.py and presentation-4.py build every Table and Column at
+import time.  With hundreds of models that's a noticeable part of
+startup, and it's the same work every time until the code changes.
+cached_metadata() runs the function that builds the tables once, pickles
+the MetaData into a file, and on later starts loads it from there
+instead:
+
+    def build():
+        metadata = MetaData()
+        Table('user', metadata,
+              Column('id', Integer, primary_key=True),
+              Column('name', String(50)))
+        ...
+        return metadata
+
+    metadata = cached_metadata('models.pickle', build)
+    Base = declarative_base(metadata=metadata)
+
+    class User(Base):
+        __table__ = metadata.tables['user']
+        addresses = relationship("Address")
+
+The snapshot is tagged with a hash of the source file build() lives in
+(and the SQLAlchemy version), so editing the models rebuilds it; pass
+``version`` to tag it some other way.
+
+Mappers can't go in the file - they're tied to the classes, their
+instrumentation and whatever functions the relationships were given -
+so the classes are still mapped at import.  Mapper *configuration*
+(relationships, backrefs) already waits for the first query or
+configure_mappers().  Table-level event listeners and DDL() hooks aren't
+pickled either; attach those after loading.  A MetaData that can't be
+pickled at all - a lambda or nested function as a column default, for
+one - is built on every start, with a warning, instead of cached.
+"""
+
+import hashlib
+import inspect
+import pickle
+import warnings
+
+import sqlalchemy
+
+from bulk_reflect import save_snapshot, load_snapshot
+
+
+def source_version(*objects):
+    """Hash of the source files of ``objects`` and the SQLAlchemy version."""
+    digest = hashlib.sha1(sqlalchemy.__version__.encode('ascii'))
+    for obj in objects:
+        with open(inspect.getsourcefile(obj), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cached_metadata(path, build, version=None):
+    """Return the MetaData ``build()`` makes, from ``path`` if it's there."""
+    if version is None:
+        version = source_version(build)
+    metadata = load_snapshot(path, version)
+    if metadata is None:
+        metadata = build()
+        try:
+            save_snapshot(path, version, metadata)
+        except (pickle.PicklingError, AttributeError, TypeError,
+                IOError, OSError) as e:
+            # a lambda default, say, or a read-only directory; start
+            # up without the snapshot
+            warnings.warn("MetaData snapshot %s not saved: %s" % (path, e))
+    return metadata
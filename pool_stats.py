@@ -0,0 +1,157 @@
+__author__ = 'davis'
+"""
+Connection pool instrumentation.
+
+create_engine() gives us a pool we never look at.  PoolMonitor listens
+to the pool events (connect, checkout, checkin, invalidate, close) and
+keeps counts, a histogram of how long callers waited for a connection,
+the highest overflow reached and how long connections lived.
+
+    engine = create_engine("sqlite:///some.db", pool_size=5, max_overflow=10)
+    monitor = PoolMonitor(engine)
+    conn = monitor.connect()        # engine.connect(), but timed
+    ...
+    print(monitor.report())
+
+Checkout wait is only known for connections obtained through
+monitor.connect(); plain engine.connect() calls are still counted.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+
+# upper bounds in milliseconds, the last bucket catches everything else
+WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class Histogram(object):
+    """Count of observations per bucket, plus total and max."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+        self.count = 0
+
+    def add(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def lines(self):
+        bounds = ['<= %s' % b for b in self.buckets] + \
+                 ['>  %s' % self.buckets[-1]]
+        for label, count in zip(bounds, self.counts):
+            if count:
+                yield "%12s ms: %d" % (label, count)
+
+
+class PoolMonitor(object):
+    """Collects pool statistics for one Engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.pool = engine.pool
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.closes = 0
+        self.max_checkedout = 0
+        self.max_overflow = 0
+        self.wait = Histogram()
+        self.lifetime = Histogram(
+            buckets=(10, 100, 1000, 10000, 60000, 600000))
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'close', self._on_close)
+
+    def remove(self):
+        """Stop listening to the pool."""
+        event.remove(self.engine, 'connect', self._on_connect)
+        event.remove(self.engine, 'checkout', self._on_checkout)
+        event.remove(self.engine, 'checkin', self._on_checkin)
+        event.remove(self.engine, 'invalidate', self._on_invalidate)
+        event.remove(self.engine, 'close', self._on_close)
+
+    def connect(self):
+        """engine.connect(), recording how long the checkout waited."""
+        self._local.requested = time.time()
+        try:
+            return self.engine.connect()
+        finally:
+            self._local.requested = None
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info['pool_stats_created'] = time.time()
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+                     connection_proxy):
+        requested = getattr(self._local, 'requested', None)
+        checkedout = self._pool_value('checkedout')
+        overflow = self._pool_value('overflow')
+        with self._lock:
+            self.checkouts += 1
+            if requested is not None:
+                self.wait.add((time.time() - requested) * 1000)
+            self.max_checkedout = max(self.max_checkedout, checkedout)
+            self.max_overflow = max(self.max_overflow, overflow)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_close(self, dbapi_connection, connection_record):
+        created = connection_record.info.get('pool_stats_created')
+        with self._lock:
+            self.closes += 1
+            if created is not None:
+                self.lifetime.add((time.time() - created) * 1000)
+
+    def _pool_value(self, name):
+        # only QueuePool has checkedout() / overflow()
+        fn = getattr(self.pool, name, None)
+        return fn() if fn is not None else 0
+
+    def report(self):
+        lines = [
+            "pool: %s" % self.pool.status(),
+            "connects: %d  checkouts: %d  checkins: %d  "
+            "invalidations: %d  closes: %d" % (
+                self.connects, self.checkouts, self.checkins,
+                self.invalidations, self.closes),
+            "max checked out: %d  max overflow: %d" % (
+                self.max_checkedout, self.max_overflow),
+            "checkout wait: mean %.2f ms, max %.2f ms over %d checkouts" % (
+                self.wait.mean, self.wait.max, self.wait.count),
+        ]
+        lines.extend(self.wait.lines())
+        if self.lifetime.count:
+            lines.append("connection lifetime: mean %.0f ms, max %.0f ms" % (
+                self.lifetime.mean, self.lifetime.max))
+        return "\n".join(lines)
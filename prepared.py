@@ -0,0 +1,65 @@
+__author__ = 'davis'
+"""
+Prepared queries.
+
+presentation-4.py builds
+
+    session.query(User).filter(User.name == 'ed').order_by(User.id)
+
+from scratch every time it runs: the entities are looked up, the
+criterion is built, and then the whole thing is compiled to SQL again.
+A PreparedQuery is defined once, with bindparam() placeholders for the
+values that change:
+
+    users_by_name = PreparedQuery(
+        lambda session: session.query(User).
+        filter(User.name == bindparam('name')).
+        order_by(User.id))
+
+    ed = users_by_name(session, name='ed').first()
+    wendy = users_by_name(session, name='wendy').first()
+
+The Query is built the first time it's called, and the SQL compiled the
+first time it runs on a given dialect; after that a call only binds the
+parameters, executes and loads the rows.  A call returns a baked Result,
+which has all(), first(), one(), one_or_none(), get(), count() and
+scalar() like a Query, and can be iterated.
+
+It's sqlalchemy.ext.baked underneath, with each PreparedQuery kept apart
+in the cache.  Plain baked queries are cached by the code of the lambda,
+so a lambda that closes over a value, like
+
+    name = 'ed'
+    lambda session: session.query(User).filter(User.name == name)
+
+silently keeps the first name it was built with.  That's still true
+inside a single PreparedQuery - the builder runs once - so anything that
+varies has to be a bindparam().
+"""
+
+from sqlalchemy.ext import baked
+
+_bakery = baked.bakery(size=500)
+
+
+class PreparedQuery(object):
+    """A Query built once and executed with new parameters per call."""
+
+    def __init__(self, build, bakery=None):
+        self.build = build
+        # self is part of the cache key, so two PreparedQuery objects
+        # never share an entry even if they use the same function
+        self._baked = (bakery or _bakery)(build, self)
+
+    def __call__(self, session, **params):
+        result = self._baked(session)
+        if params:
+            result = result.params(**params)
+        return result
+
+    def with_criteria(self, fn):
+        """Return a new PreparedQuery that also applies ``fn(query)``."""
+        prepared = PreparedQuery.__new__(PreparedQuery)
+        prepared.build = self.build
+        prepared._baked = self._baked.with_criteria(fn)
+        return prepared
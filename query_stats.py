@@ -0,0 +1,210 @@
+__author__ = 'davis'
+"""
+Query statistics and N+1 detection.
+
+    for user in session.query(User):
+        print(user, user.addresses)
+
+"if you have 5 rows, you will do six queries".  QueryStats listens to
+the engine's cursor execute events, groups the statements by their
+normalized SQL (parameters and IN lists collapsed), times them, and
+recognizes the lazy loads of each relationship() by the shape of the
+SELECT the lazy loader emits.  A relationship lazy loaded more than
+``lazy_threshold`` times within one transaction of the Session is
+reported as an N+1 pattern.  A many-to-one lazy load by primary key
+emits the same SQL as query.get(), so those are counted together.
+
+    with QueryStats(session, max_queries=10) as stats:
+        for user in session.query(User):
+            user.addresses
+    print(stats.report())
+
+Leaving the block raises AssertionError when more than max_queries
+statements ran, or, with fail_on_n_plus_one=True, when an N+1 pattern
+was seen, so it can be used directly inside a test.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.mapper import _mapper_registry
+
+_whitespace = re.compile(r'\s+')
+_params = re.compile(r"%\(\w+\)s|:\w+|\?|%s|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_list = re.compile(r'IN \((?:\?, )+\?\)')
+
+
+def normalize(statement):
+    """Reduce ``statement`` to its shape: one "?" per parameter or literal,
+    one "(?)" per IN list, single spaces."""
+    statement = _whitespace.sub(' ', statement.strip())
+    statement = _params.sub('?', statement)
+    return _in_list.sub('IN (?)', statement)
+
+
+class StatementStats(object):
+    """Executions and cumulative time for one normalized statement."""
+
+    __slots__ = ('statement', 'count', 'seconds', 'relationship')
+
+    def __init__(self, statement, relationship=None):
+        self.statement = statement
+        self.relationship = relationship
+        self.count = 0
+        self.seconds = 0.0
+
+
+def lazy_load_signatures(dialect):
+    """Map normalized lazy load SQL to the relationship that emits it."""
+    signatures = {}
+    for mapper in list(_mapper_registry):
+        for prop in mapper.relationships:
+            if prop.secondary is not None:
+                continue
+            strategy = prop._get_strategy((("lazy", "select"),))
+            target = prop.mapper
+            if strategy.use_get:
+                criterion = target._get_clause[0]
+            else:
+                criterion = strategy._lazywhere
+            q = Query(target).filter(criterion)
+            if prop.order_by:
+                q = q.order_by(*prop.order_by)
+            sql = normalize(str(
+                q.with_labels().statement.compile(dialect=dialect)))
+            signatures.setdefault(sql, str(prop))
+    return signatures
+
+
+class QueryStats(object):
+    """Collects statement statistics for an Engine or a Session."""
+
+    def __init__(self, bind, max_queries=None, lazy_threshold=1,
+                 fail_on_n_plus_one=False):
+        if isinstance(bind, Session):
+            self.session = bind
+            self.engine = bind.get_bind()
+        else:
+            self.session = None
+            self.engine = bind
+        if not isinstance(self.engine, Engine):
+            self.engine = self.engine.engine
+        self.max_queries = max_queries
+        self.lazy_threshold = lazy_threshold
+        self.fail_on_n_plus_one = fail_on_n_plus_one
+
+        self.statements = {}
+        self.n_plus_one = {}
+        self._unit_lazy_loads = Counter()
+        self._signatures = None
+        self._lock = threading.Lock()
+        self._listening = False
+
+    @property
+    def count(self):
+        return sum(s.count for s in self.statements.values())
+
+    @property
+    def seconds(self):
+        return sum(s.seconds for s in self.statements.values())
+
+    def start(self):
+        if self._listening:
+            return self
+        event.listen(self.engine, 'before_cursor_execute',
+                     self._before_execute)
+        event.listen(self.engine, 'after_cursor_execute',
+                     self._after_execute)
+        if self.session is not None:
+            event.listen(self.session, 'after_commit', self._end_unit)
+            event.listen(self.session, 'after_rollback', self._end_unit)
+        self._listening = True
+        return self
+
+    def stop(self):
+        if not self._listening:
+            return
+        event.remove(self.engine, 'before_cursor_execute',
+                     self._before_execute)
+        event.remove(self.engine, 'after_cursor_execute',
+                     self._after_execute)
+        if self.session is not None:
+            event.remove(self.session, 'after_commit', self._end_unit)
+            event.remove(self.session, 'after_rollback', self._end_unit)
+        self._listening = False
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.n_plus_one.clear()
+            self._unit_lazy_loads.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type_, value, traceback):
+        self.stop()
+        if type_ is None:
+            self.check()
+
+    def check(self):
+        """Raise AssertionError if the configured limits were exceeded."""
+        if self.max_queries is not None and self.count > self.max_queries:
+            raise AssertionError(
+                "%d queries executed, at most %d expected\n%s" % (
+                    self.count, self.max_queries, self.report()))
+        if self.fail_on_n_plus_one and self.n_plus_one:
+            raise AssertionError(
+                "N+1 lazy loading detected\n%s" % self.report())
+
+    def _before_execute(self, conn, cursor, statement, parameters,
+                        context, executemany):
+        conn.info.setdefault('query_stats_start', []).append(time.time())
+
+    def _after_execute(self, conn, cursor, statement, parameters,
+                       context, executemany):
+        elapsed = time.time() - conn.info['query_stats_start'].pop()
+        key = normalize(statement)
+        if self._signatures is None:
+            self._signatures = lazy_load_signatures(conn.dialect)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(
+                    key, self._signatures.get(key))
+            stats.count += 1
+            stats.seconds += elapsed
+            if stats.relationship is not None:
+                self._unit_lazy_loads[stats.relationship] += 1
+                loads = self._unit_lazy_loads[stats.relationship]
+                if loads > self.lazy_threshold:
+                    self.n_plus_one[stats.relationship] = max(
+                        loads, self.n_plus_one.get(stats.relationship, 0))
+
+    def _end_unit(self, session):
+        with self._lock:
+            self._unit_lazy_loads.clear()
+
+    def report(self, limit=20):
+        lines = ["%d statements, %.1f ms total" % (
+            self.count, self.seconds * 1000)]
+        by_count = sorted(self.statements.values(),
+                          key=lambda s: (-s.count, -s.seconds))
+        for stats in by_count[:limit]:
+            statement = stats.statement
+            if len(statement) > 100:
+                statement = statement[:97] + '...'
+            lines.append("%6d x %9.1f ms  %s%s" % (
+                stats.count, stats.seconds * 1000, statement,
+                stats.relationship and
+                "  [lazy load %s]" % stats.relationship or ''))
+        for relationship, loads in sorted(self.n_plus_one.items()):
+            lines.append("N+1: %s lazy loaded %d times in one transaction" % (
+                relationship, loads))
+        return "\n".join(lines)
@@ -0,0 +1,296 @@
+__author__ = 'davis'
+"""
+Query result cache.
+
+A lookup like
+
+    session.query(User).filter_by(name='ed').first()
+
+goes to the database every time it runs.  CachingQuery adds a cached()
+method; the results are then kept in a ResultCache under a key made from
+the compiled SQL and its parameters:
+
+    cache = ResultCache(MemoryBackend(capacity=1000), ttl=300)
+    session = Session(bind=engine, query_cls=CachingQuery)
+    cache.invalidate_on_flush(session)
+
+    ed = session.query(User).filter_by(name='ed').cached(cache).first()
+
+Objects come back from the cache merged into the Session without a
+SELECT (Session.merge(load=False)), so they're in the identity map same
+as if they'd been loaded.
+
+Two backends: MemoryBackend, an LRU in this process, and DbmBackend, a
+dbm file that outlives the process.  Entries are pickled either way, so
+changing an object in one Session never changes what's cached.
+
+Invalidation works per table.  Every entry remembers the tables in its
+SELECT, and when invalidate_on_flush()'s Session flushes INSERT, UPDATE
+or DELETE for a table (or runs query.update() / query.delete() on it),
+every entry using that table goes stale.  Until the transaction ends,
+queries against those tables skip the cache entirely, so uncommitted
+rows are never cached.  So do queries against tables with changes the
+Session hasn't flushed yet (autoflush off, or no_autoflush), which
+merging cached rows would overwrite.  Not tracked: writes through Core
+(conn.execute(user_table.update())) or other processes, tables that only
+subqueryload() / selectinload() read (use joinedload() for cached
+queries), and relationships lazy loaded after the fact.
+"""
+
+import hashlib
+import itertools
+import pickle
+import threading
+import time
+
+try:
+    import dbm
+except ImportError:
+    import anydbm as dbm
+
+from sqlalchemy import event
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.sql.util import find_tables
+
+from lru import LRUCache
+from statement_cache import StatementCache
+
+_WRITTEN = 'result_cache_written'
+
+
+class MemoryBackend(object):
+    """Entries in an in-process LRU."""
+
+    def __init__(self, capacity=500):
+        self.entries = LRUCache(capacity)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, value):
+        self.entries.put(key, value)
+
+    def delete(self, key):
+        self.entries.discard(key)
+
+    def generation(self, table):
+        return self._generations.get(table, 0)
+
+    def bump(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+
+
+class DbmBackend(object):
+    """Entries in a dbm file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = dbm.open(path, 'c')
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                return self._db[key]
+            except KeyError:
+                return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._db[key] = value
+
+    def delete(self, key):
+        with self._lock:
+            try:
+                del self._db[key]
+            except KeyError:
+                pass
+
+    def generation(self, table):
+        value = self.get('table:' + table)
+        return int(value) if value is not None else 0
+
+    def bump(self, table):
+        with self._lock:
+            key = 'table:' + table
+            value = int(self._db[key]) + 1 if key in self._db else 1
+            self._db[key] = str(value)
+
+    def close(self):
+        self._db.close()
+
+
+class ResultCache(object):
+    """Pickled query results with a TTL and per-table invalidation."""
+
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.statements = _Statements()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        expires, generations, rows = pickle.loads(value)
+        if (expires is not None and expires < time.time()) or \
+                any(self.backend.generation(table) != generation
+                    for table, generation in generations):
+            self.backend.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return rows
+
+    def put(self, key, tables, rows, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.time() + ttl if ttl is not None else None
+        generations = [(table, self.backend.generation(table))
+                       for table in tables]
+        self.backend.put(key, pickle.dumps(
+            (expires, generations, rows), pickle.HIGHEST_PROTOCOL))
+
+    def invalidate(self, tables):
+        """Make every entry that reads one of ``tables`` stale."""
+        for table in tables:
+            self.backend.bump(table)
+
+    def invalidate_on_flush(self, session):
+        """Invalidate tables written by ``session`` (or a Session class)."""
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'after_bulk_update', self._after_bulk)
+        event.listen(session, 'after_bulk_delete', self._after_bulk)
+        event.listen(session, 'after_commit', self._after_transaction)
+        event.listen(session, 'after_rollback', self._after_transaction)
+
+    def _written(self, session, tables):
+        self.invalidate(tables)
+        session.info.setdefault(_WRITTEN, set()).update(tables)
+
+    def _after_flush(self, session, flush_context):
+        tables = set()
+        for obj in list(session.new) + list(session.dirty) + \
+                list(session.deleted):
+            tables.update(table_names(instance_state(obj).mapper))
+        self._written(session, tables)
+
+    def _after_bulk(self, context):
+        self._written(context.session, table_names(context.mapper))
+
+    def _after_transaction(self, session):
+        # the flush invalidated these already, but a query may have
+        # been cached from another Session since
+        self.invalidate(session.info.pop(_WRITTEN, ()))
+
+    def stats(self):
+        return "%d hits, %d misses" % (self.hits, self.misses)
+
+
+def table_names(mapper):
+    """Tables a flush of ``mapper`` can write, association tables too."""
+    names = set(table.name for table in mapper.tables)
+    for prop in mapper.relationships:
+        if prop.secondary is not None:
+            names.update(t.name for t in find_tables(prop.secondary))
+    return names
+
+
+def _unflushed_tables(session):
+    """Tables of new, deleted or changed objects not flushed yet.
+
+    With autoflush off, merging cached rows would overwrite those
+    changes on the objects in the identity map.
+    """
+    mappers = set(state.mapper for state in itertools.chain(
+        session._new, session._deleted, session.identity_map._modified))
+    tables = set()
+    for mapper in mappers:
+        tables.update(table_names(mapper))
+    return tables
+
+
+def statement_tables(statement):
+    return sorted(set(table.name for table in find_tables(
+        statement, include_crud=True)))
+
+
+def _digest(dialect, sql, values):
+    text = "%s\n%s\n%r" % (dialect.name, sql, values)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class _Statements(object):
+    """Compiled SQL and tables per statement.
+
+    The key is the compiled SQL string and its parameters.  A
+    statement_cache.StatementCache keeps the Compiled per statement
+    structure, so that a statement seen before isn't compiled again
+    just to compute its result cache key.
+    """
+
+    def __init__(self, capacity=500):
+        self._compiled = StatementCache(capacity)
+        self._tables = LRUCache(capacity)
+
+    def key(self, statement, dialect, params=None):
+        """Return (key, tables) for ``statement``'s results."""
+        compiled, values = self._compiled.compile(statement, dialect)
+        if values is None:
+            # uncacheable, compiled just now
+            values = compiled.params
+            tables = statement_tables(statement)
+        else:
+            tables = self._tables.get(compiled)
+            if tables is None:
+                tables = statement_tables(statement)
+                self._tables.put(compiled, tables)
+        values = dict(values, **(params or {}))
+        return _digest(dialect, compiled, sorted(values.items())), tables
+
+
+class CachingQuery(Query):
+    """Query with a cached() method."""
+
+    _result_cache = None
+    _result_ttl = None
+
+    def cached(self, cache, ttl=None):
+        """Return a copy of this Query whose results go through ``cache``."""
+        q = self._clone()
+        q._result_cache = cache
+        q._result_ttl = ttl
+        return q
+
+    def __iter__(self):
+        cache = self._result_cache
+        if cache is None:
+            return super(CachingQuery, self).__iter__()
+
+        session = self.session
+        if self._autoflush and not session._flushing:
+            session._autoflush()
+        statement = self.statement
+        bind = session.get_bind(self._bind_mapper(), clause=statement)
+        key, tables = cache.statements.key(
+            statement, bind.dialect, self._params)
+        if session.info.get(_WRITTEN, set()).intersection(tables) or \
+                _unflushed_tables(session).intersection(tables):
+            return super(CachingQuery, self).__iter__()
+
+        rows = cache.get(key)
+        if rows is None:
+            rows = [row if self._is_single_entity() else tuple(row)
+                    for row in super(CachingQuery, self).__iter__()]
+            cache.put(key, tables, rows, self._result_ttl)
+        return iter(self.merge_result(rows, load=False))
+
+    def _is_single_entity(self):
+        return not self._only_return_tuples and len(self._entities) == 1 \
+            and self._entities[0].supports_single_entity
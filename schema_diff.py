@@ -0,0 +1,217 @@
+__author__ = 'davis'
+"""
+Schema diff: what DDL turns the database into the MetaData.
+
+presentation-2.py declares network_table and reflects network_reflected
+but never compares the two.  compare() does that for a whole MetaData:
+
+    changes = compare(metadata, engine)
+    for statement in ddl(changes, engine.dialect):
+        print(statement)
+
+The database side is reflected with bulk_reflect.reflect() (a few
+queries for the whole schema on SQLite), or can be given as an already
+reflected MetaData, such as one loaded from a bulk_reflect snapshot:
+
+    changes = compare(metadata, reflected, dialect=engine.dialect)
+
+Each table is boiled down to a definition - columns with their type as
+the dialect would render it, nullability, primary key, foreign keys
+(composite ones like published -> story included) and indexes - and the
+definitions are hashed; only tables whose hashes differ are compared
+column by column, so unchanged tables cost a hash each.
+
+Not compared: server defaults, CHECK and UNIQUE constraints, comments.
+SQLite can't ALTER a column or add/drop a foreign key; ddl() emits
+those as SQL comments saying the table needs rebuilding.
+"""
+
+import collections
+import hashlib
+
+from sqlalchemy import exc
+from sqlalchemy.schema import CreateTable, DropTable, CreateIndex, DropIndex
+from sqlalchemy.schema import AddConstraint, DropConstraint
+
+from bulk_reflect import reflect
+
+
+# One difference.  ``op`` is add_table, drop_table, add_column,
+# drop_column, alter_column, add_fk, drop_fk, add_index or drop_index;
+# ``detail`` is the Table, Column, ForeignKeyConstraint or Index to
+# create (from the MetaData) or to drop (from the database), or for
+# alter_column a (declared Column, reflected Column) pair.
+Change = collections.namedtuple('Change', ['op', 'table', 'name', 'detail'])
+
+
+def _type(column, dialect):
+    try:
+        return column.type.compile(dialect=dialect).upper()
+    except exc.CompileError:
+        # NullType, for columns reflected without a type
+        return None
+
+
+def _fk_key(fkc):
+    return (tuple(fkc.column_keys), fkc.referred_table.fullname,
+            tuple(element.column.name for element in fkc.elements))
+
+
+def _index_key(index):
+    return (tuple(column.name for column in index.columns),
+            bool(index.unique))
+
+
+def definition(table, dialect):
+    """The parts of ``table`` compare() looks at, as plain tuples."""
+    columns = tuple((column.name, _type(column, dialect),
+                     bool(column.nullable) and not column.primary_key)
+                    for column in table.columns)
+    pk = tuple(column.name for column in table.primary_key)
+    fks = tuple(sorted(_fk_key(fkc)
+                       for fkc in table.foreign_key_constraints))
+    indexes = tuple(sorted(_index_key(index) for index in table.indexes))
+    return columns, pk, fks, indexes
+
+
+def table_hash(table, dialect):
+    return hashlib.sha1(
+        repr(definition(table, dialect)).encode('utf-8')).hexdigest()
+
+
+def _compare_table(declared, reflected, dialect):
+    changes = []
+    name = declared.fullname
+    columns = dict((c.name, c) for c in reflected.columns)
+    for column in declared.columns:
+        existing = columns.pop(column.name, None)
+        if existing is None:
+            changes.append(Change('add_column', name, column.name, column))
+        elif (_type(column, dialect), bool(column.nullable) and
+              not column.primary_key) != \
+                (_type(existing, dialect), bool(existing.nullable) and
+                 not existing.primary_key):
+            changes.append(Change('alter_column', name, column.name,
+                                  (column, existing)))
+    for column in reflected.columns:
+        if column.name in columns:
+            changes.append(Change('drop_column', name, column.name, column))
+
+    fks = dict((_fk_key(fkc), fkc)
+               for fkc in reflected.foreign_key_constraints)
+    for fkc in declared.foreign_key_constraints:
+        if fks.pop(_fk_key(fkc), None) is None:
+            changes.append(Change('add_fk', name, fkc.name, fkc))
+    for fkc in fks.values():
+        changes.append(Change('drop_fk', name, fkc.name, fkc))
+
+    indexes = dict((_index_key(index), index) for index in reflected.indexes)
+    for index in declared.indexes:
+        if indexes.pop(_index_key(index), None) is None:
+            changes.append(Change('add_index', name, index.name, index))
+    for index in indexes.values():
+        changes.append(Change('drop_index', name, index.name, index))
+    return changes
+
+
+def compare(metadata, target, dialect=None, schema=None):
+    """Return the Changes that take ``target`` to ``metadata``.
+
+    ``target`` is an Engine or Connection to reflect, or a reflected
+    MetaData (then ``dialect`` is needed to compare types).
+    """
+    if dialect is None:
+        dialect = target.dialect
+    if not hasattr(target, 'tables'):
+        target = reflect(target, schema=schema)
+
+    declared = [t for t in metadata.sorted_tables if t.schema == schema]
+    names = set(t.fullname for t in declared)
+    reflected = target.tables
+
+    changes = []
+    for table in declared:
+        existing = reflected.get(table.fullname)
+        if existing is None:
+            changes.append(Change('add_table', table.fullname, table.name,
+                                  table))
+        elif table_hash(table, dialect) != table_hash(existing, dialect):
+            changes.extend(_compare_table(table, existing, dialect))
+    for table in reversed(target.sorted_tables):
+        if table.fullname not in names:
+            changes.append(Change('drop_table', table.fullname,
+                                  table.name, table))
+    return changes
+
+
+def _column_spec(column, dialect):
+    return dialect.ddl_compiler(dialect, None).get_column_specification(
+        column)
+
+
+def _alter_column(change, dialect):
+    column, existing = change.detail
+    preparer = dialect.identifier_preparer
+    table = preparer.format_table(column.table)
+    name = preparer.format_column(column)
+    if dialect.name == 'postgresql':
+        statements = []
+        if _type(column, dialect) != _type(existing, dialect):
+            statements.append("ALTER TABLE %s ALTER COLUMN %s TYPE %s" % (
+                table, name, _type(column, dialect)))
+        if column.nullable != existing.nullable:
+            statements.append("ALTER TABLE %s ALTER COLUMN %s %s NOT NULL" % (
+                table, name, 'DROP' if column.nullable else 'SET'))
+        return statements
+    if dialect.name == 'mysql':
+        return ["ALTER TABLE %s MODIFY COLUMN %s" % (
+            table, _column_spec(column, dialect))]
+    return ["-- %s can't alter column %s.%s; rebuild the table" % (
+        dialect.name, change.table, change.name)]
+
+
+def ddl(changes, dialect):
+    """Render ``changes`` as a list of DDL strings for ``dialect``."""
+    statements = []
+
+    def render(construct):
+        statements.append(str(construct.compile(dialect=dialect)).strip())
+
+    alter_constraints = dialect.name != 'sqlite'
+    for change in changes:
+        op = change.op
+        if op == 'add_table':
+            render(CreateTable(change.detail))
+            for index in change.detail.indexes:
+                render(CreateIndex(index))
+        elif op == 'drop_table':
+            render(DropTable(change.detail))
+        elif op == 'add_column':
+            statements.append("ALTER TABLE %s ADD COLUMN %s" % (
+                dialect.identifier_preparer.format_table(
+                    change.detail.table),
+                _column_spec(change.detail, dialect)))
+        elif op == 'drop_column':
+            statements.append("ALTER TABLE %s DROP COLUMN %s" % (
+                dialect.identifier_preparer.format_table(
+                    change.detail.table),
+                dialect.identifier_preparer.format_column(change.detail)))
+        elif op == 'alter_column':
+            statements.extend(_alter_column(change, dialect))
+        elif op in ('add_fk', 'drop_fk') and not alter_constraints:
+            statements.append(
+                "-- %s can't %s a foreign key on %s; rebuild the table" % (
+                    dialect.name, op[:-3], change.table))
+        elif op == 'add_fk':
+            render(AddConstraint(change.detail))
+        elif op == 'drop_fk' and change.detail.name is None:
+            statements.append(
+                "-- foreign key on %s (%s) has no name to drop it by" % (
+                    change.table, ', '.join(change.detail.column_keys)))
+        elif op == 'drop_fk':
+            render(DropConstraint(change.detail))
+        elif op == 'add_index':
+            render(CreateIndex(change.detail))
+        elif op == 'drop_index':
+            render(DropIndex(change.detail))
+    return statements
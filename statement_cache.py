@@ -0,0 +1,299 @@
+__author__ = 'davis'
+"""
+Compiled statement cache.
+
+presentation-3.py builds something like
+
+    select([user_table]).where(user_table.c.username == 'ed')
+
+and every execute() compiles it to a SQL string again, even though only
+the 'ed' changes from call to call.  StatementCache computes a key from
+the *structure* of the statement - tables, columns, operators and the
+position of each bound parameter, but not the bound values - and keeps
+the Compiled object per key and dialect.  On a hit, the values of the
+new statement's bound parameters are lined up with the cached Compiled
+and it is executed directly.
+
+    cache = StatementCache()
+    for name in ['ed', 'wendy', 'mary']:
+        stmt = select([user_table]).where(user_table.c.username == name)
+        cache.execute(conn, stmt).fetchall()
+    print(cache.stats())
+
+Only constructs listed in _KEYS below are understood.  Anything else
+(INSERT/UPDATE with values, CAST, hints, correlation tweaks...) makes the
+statement "uncacheable" and it is executed the normal way.
+"""
+
+from sqlalchemy.sql import elements
+from sqlalchemy.sql import selectable
+from sqlalchemy.sql import functions
+from sqlalchemy.sql import dml
+from sqlalchemy.schema import Table
+
+from lru import LRUCache
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _name(name):
+    # anonymous names ("%(4353 username)s") differ per statement
+    # and are renamed by the compiler anyway
+    if isinstance(name, elements._anonymous_label):
+        return None
+    return name
+
+
+def _from_key(from_, froms):
+    """Refer to a FROM object by identity (Table) or by position."""
+    if isinstance(from_, Table):
+        return from_
+    if from_ is None:
+        return None
+    if from_ not in froms:
+        froms[from_] = len(froms)
+    return froms[from_]
+
+
+def _column(elem, froms, binds):
+    return (_name(elem.name), _from_key(elem.table, froms),
+            elem.is_literal, elem.type.__class__)
+
+
+def _table(elem, froms, binds):
+    return (_from_key(elem, froms),)
+
+
+def _bind(elem, froms, binds):
+    binds.append(elem)
+    return (_name(elem.key), elem.type.__class__, elem.expanding)
+
+
+def _binary(elem, froms, binds):
+    if elem.modifiers:
+        return (elem.operator, elem.negate,
+                tuple(sorted(elem.modifiers.items())))
+    return (elem.operator, elem.negate)
+
+
+def _unary(elem, froms, binds):
+    return (elem.operator, elem.modifier)
+
+
+def _clauselist(elem, froms, binds):
+    return (elem.operator, elem.group, elem.group_contents)
+
+
+def _label(elem, froms, binds):
+    return (_name(elem.name),)
+
+
+def _alias(elem, froms, binds):
+    return (_from_key(elem, froms), _name(elem.name))
+
+
+def _function(elem, froms, binds):
+    return (elem.name, tuple(getattr(elem, 'packagenames', ())),
+            elem.type.__class__)
+
+
+def _text(elem, froms, binds):
+    return (elem.text,)
+
+
+def _join(elem, froms, binds):
+    return (_from_key(elem, froms), elem.isouter, elem.full)
+
+
+def _distinct(elem):
+    # DISTINCT ON (...) is a list of expressions that get_children()
+    # doesn't visit; plain columns can be keyed by identity, anything
+    # with binds in it can't be keyed at all
+    if not isinstance(elem._distinct, list):
+        return elem._distinct
+    for expr in elem._distinct:
+        if not isinstance(expr, elements.ColumnClause):
+            raise _Uncacheable()
+    return tuple(elem._distinct)
+
+
+def _select(elem, froms, binds):
+    if elem._correlate or elem._correlate_except or elem._hints or \
+            elem._statement_hints or elem._prefixes or elem._suffixes or \
+            elem._for_update_arg is not None:
+        raise _Uncacheable()
+    # LIMIT / OFFSET binds aren't part of get_children(), so their
+    # values have to be part of the key; that takes plain integers,
+    # not bindparam('x') or other expressions
+    for clause, simple in ((elem._limit_clause, elem._simple_int_limit),
+                           (elem._offset_clause, elem._simple_int_offset)):
+        if clause is not None and not simple:
+            raise _Uncacheable()
+    return (_from_key(elem, froms), _distinct(elem), elem.use_labels,
+            elem._auto_correlate, elem._limit, elem._offset)
+
+
+def _select_children(elem):
+    # the same expression can go in WHERE or HAVING, so the children are
+    # keyed along with the clause they fill, not just by count
+    children = ['columns'] + list(elem._raw_columns) + \
+        ['froms'] + list(elem._froms)
+    for slot, clause in (('where', elem._whereclause),
+                         ('having', elem._having),
+                         ('order_by', elem._order_by_clause),
+                         ('group_by', elem._group_by_clause)):
+        if clause is not None:
+            children.extend((slot, clause))
+    return children
+
+
+def _delete(elem, froms, binds):
+    if elem._returning or elem._hints or elem._prefixes:
+        raise _Uncacheable()
+    # get_children() is only the WHERE clause
+    return (_from_key(elem.table, froms),)
+
+
+def _nothing(elem, froms, binds):
+    return ()
+
+
+_KEYS = {
+    elements.ColumnClause: _column,
+    selectable.TableClause: _table,
+    Table: _table,
+    elements.BindParameter: _bind,
+    elements.BinaryExpression: _binary,
+    elements.UnaryExpression: _unary,
+    elements.ClauseList: _clauselist,
+    elements.BooleanClauseList: _clauselist,
+    elements.Label: _label,
+    elements.Grouping: _nothing,
+    selectable.FromGrouping: _nothing,
+    elements.Null: _nothing,
+    elements.True_: _nothing,
+    elements.False_: _nothing,
+    elements.TextClause: _text,
+    selectable.Alias: _alias,
+    selectable.Join: _join,
+    selectable.Select: _select,
+    selectable.ScalarSelect: _nothing,
+    dml.Delete: _delete,
+}
+
+# constructs whose get_children() doesn't say which child is which
+_CHILDREN = {
+    selectable.Select: _select_children,
+}
+
+
+def cache_key(statement):
+    """Return (key, bindparams) for ``statement``, or (None, None).
+
+    ``bindparams`` lists the statement's BindParameter objects in the
+    same order for every statement sharing the key.
+    """
+    froms = {}
+    binds = []
+    key = []
+    stack = [statement]
+    try:
+        while stack:
+            elem = stack.pop()
+            if isinstance(elem, str):
+                # which clause the children that follow belong to
+                key.append(elem)
+                continue
+            cls = type(elem)
+            fn = _KEYS.get(cls)
+            if fn is None:
+                # schema.Column and friends subclass ColumnClause
+                if isinstance(elem, elements.ColumnClause):
+                    fn = _column
+                elif isinstance(elem, functions.FunctionElement):
+                    fn = _function
+                else:
+                    raise _Uncacheable()
+            key.append((cls,) + fn(elem, froms, binds))
+            children = _CHILDREN.get(cls)
+            if children is not None:
+                children = children(elem)
+            else:
+                children = list(elem.get_children(column_collections=False))
+            key.append(len(children))
+            stack.extend(reversed(children))
+    except _Uncacheable:
+        return None, None
+    return tuple(key), binds
+
+
+class StatementCache(object):
+    """Compiled objects per statement structure and dialect."""
+
+    def __init__(self, size=500):
+        self._cache = LRUCache(size)
+        self.uncacheable = 0
+
+    @property
+    def hits(self):
+        return self._cache.hits
+
+    @property
+    def misses(self):
+        return self._cache.misses
+
+    def compile(self, statement, dialect):
+        """Return (compiled, params) for ``statement``.
+
+        ``params`` maps the Compiled's bind names to the values found in
+        ``statement``; it is None when the statement couldn't be cached
+        and ``compiled`` came straight from statement.compile().
+        """
+        key, binds = cache_key(statement)
+        if key is None:
+            self.uncacheable += 1
+            return statement.compile(dialect=dialect), None
+
+        key = (dialect, key)
+        entry = self._cache.get(key)
+        if entry is None:
+            compiled = statement.compile(dialect=dialect)
+            names = [compiled.bind_names.get(b) for b in binds]
+            entry = (compiled, names)
+            self._cache.put(key, entry)
+
+        compiled, names = entry
+        params = {}
+        for name, bind in zip(names, binds):
+            # required binds are left for the caller to supply
+            if name is not None and not bind.required:
+                params[name] = bind.effective_value
+        return compiled, params
+
+    def execute(self, conn, statement, *multiparams, **params):
+        """conn.execute(statement, ...) using the cached Compiled."""
+        compiled, bound = self.compile(statement, conn.dialect)
+        if bound is None:
+            return conn.execute(statement, *multiparams, **params)
+        if multiparams:
+            multiparams = [dict(bound, **p) for p in _flatten(multiparams)]
+            return conn.execute(compiled, multiparams)
+        bound.update(params)
+        return conn.execute(compiled, bound)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return "%s, %d uncacheable" % (self._cache.stats(), self.uncacheable)
+
+
+def _flatten(multiparams):
+    for p in multiparams:
+        if isinstance(p, (list, tuple)):
+            for each in p:
+                yield each
+        else:
+            yield p
@@ -0,0 +1,59 @@
+__author__ = 'davis'
+"""
+Streaming results.
+
+engine.execute() followed by fetchall() builds every row of the result
+in memory at once.  The functions here ask the DBAPI for a server side
+cursor with the "stream_results" execution option and then hand rows
+back a partition at a time, so memory stays flat no matter how large
+the result is.
+
+psycopg2 and mysqldb honor stream_results with a real server side cursor.
+pysqlite steps through the result lazily already and simply ignores the
+option, so the same code runs everywhere.
+"""
+
+from sqlalchemy.engine import Engine
+
+DEFAULT_PARTITION_SIZE = 1000
+
+
+def stream(bind, statement, *multiparams, **params):
+    """Execute ``statement`` and return a streaming ResultProxy.
+
+    ``bind`` is an Engine or Connection.  When an Engine is given the
+    connection is closed along with the result, just like engine.execute().
+    """
+    if isinstance(bind, Engine):
+        conn = bind.connect(close_with_result=True)
+    else:
+        conn = bind
+    conn = conn.execution_options(stream_results=True)
+    return conn.execute(statement, *multiparams, **params)
+
+
+def partitions(result, size=DEFAULT_PARTITION_SIZE):
+    """Yield lists of at most ``size`` rows until ``result`` is exhausted.
+
+    The result is closed once the last partition has been handed out.
+    """
+    try:
+        while True:
+            rows = result.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        result.close()
+
+
+def yield_per(result, size=DEFAULT_PARTITION_SIZE):
+    """Yield rows one by one, fetching ``size`` rows at a time."""
+    for rows in partitions(result, size):
+        for row in rows:
+            yield row
+
+
+def stream_partitions(bind, statement, size=DEFAULT_PARTITION_SIZE, **params):
+    """Shortcut for partitions(stream(bind, statement, **params), size)."""
+    return partitions(stream(bind, statement, **params), size)
@@ -0,0 +1,84 @@
+__author__ = 'davis'
+"""
+Regression tests for statement_cache.cache_key().
+
+    python -m pytest test_statement_cache.py
+"""
+
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy import MetaData, Table, Column, Integer
+from sqlalchemy import select, func, bindparam
+
+from statement_cache import StatementCache, cache_key
+
+metadata = MetaData()
+t = Table('t', metadata,
+          Column('id', Integer, primary_key=True),
+          Column('a', Integer)
+          )
+u = Table('u', metadata,
+          Column('id', Integer, primary_key=True)
+          )
+
+
+class CacheKeyTest(unittest.TestCase):
+
+    def test_where_and_having_differ(self):
+        base = select([t.c.a, func.count()]).group_by(t.c.a)
+        where = base.where(func.count() > 1)
+        having = base.having(func.count() > 1)
+        self.assertNotEqual(cache_key(where)[0], cache_key(having)[0])
+
+    def test_where_and_having_execute_their_own_sql(self):
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        conn = engine.connect()
+        conn.execute(t.insert(), [{'a': 1}, {'a': 1}, {'a': 2}])
+        cache = StatementCache()
+        base = select([t.c.a, func.count()]).group_by(t.c.a)
+        having = base.having(t.c.id > 1)
+        where = base.where(t.c.id > 1)
+        for stmt in (having, where):
+            self.assertEqual(sorted(cache.execute(conn, stmt).fetchall()),
+                             sorted(conn.execute(stmt).fetchall()))
+        self.assertEqual(sorted(conn.execute(where).fetchall()),
+                         [(1, 1), (2, 1)])
+
+    def test_distinct_on(self):
+        key, binds = cache_key(select([t]).distinct(t.c.a))
+        self.assertIsNotNone(key)
+        hash(key)
+        self.assertNotEqual(
+            key, cache_key(select([t]).distinct(t.c.id))[0])
+
+    def test_distinct_on_expression_is_uncacheable(self):
+        self.assertEqual(
+            cache_key(select([t]).distinct(t.c.a + 5)), (None, None))
+
+    def test_delete_keys_its_table(self):
+        self.assertNotEqual(cache_key(t.delete())[0], cache_key(u.delete())[0])
+
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        conn = engine.connect()
+        conn.execute(t.insert(), [{'a': 1}])
+        conn.execute(u.insert(), [{'id': 1}])
+        cache = StatementCache()
+        cache.execute(conn, t.delete())
+        cache.execute(conn, u.delete())
+        self.assertEqual(conn.execute(select([func.count()]).select_from(u))
+                         .scalar(), 0)
+
+    def test_limit_offset(self):
+        self.assertNotEqual(cache_key(select([t]).limit(1))[0],
+                            cache_key(select([t]).limit(2))[0])
+        self.assertEqual(cache_key(select([t]).limit(bindparam('x'))),
+                         (None, None))
+        self.assertEqual(cache_key(select([t]).offset(bindparam('x'))),
+                         (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
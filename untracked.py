@@ -0,0 +1,147 @@
+__author__ = 'davis'
+"""
+Untracked, read-only loading for reports.
+
+A report like
+
+    for user in session.query(User).order_by(User.id):
+        print(user.name, user.fullname)
+
+puts every User into the identity map, instruments it for history and
+leaves it to be expired on commit, none of which a report needs.
+iterate_untracked() runs the Query's SELECT directly and builds each
+User as a *detached* object: its column attributes are loaded, it has
+an identity key, and it is in no Session.  Relationships aren't loaded
+and can't be lazy loaded later (DetachedInstanceError), same as any
+detached object; lazy="joined" relationships are left out of the SELECT,
+and eager loading options such as joinedload() raise
+InvalidRequestError.  As with Query, an entity that a JOIN repeats is
+returned once.
+
+Queries for individual columns, such as
+
+    session.query(User.name, func.coalesce(subq.c.count, 0)).\\
+        outerjoin(subq, User.id == subq.c.user_id)
+
+come back as plain result rows.
+
+UntrackedQuery makes it a Query method:
+
+    session = Session(bind=engine, query_cls=UntrackedQuery)
+    for user in session.query(User).untracked():
+        ...
+"""
+
+from sqlalchemy import exc
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.attributes import instance_state
+
+from streaming import partitions
+
+# loader strategies that load relationships along with the entity
+_EAGER = ('joined', 'subquery', 'selectin', 'immediate', 'chunked')
+
+
+def _entity_mapper(query):
+    """The mapper if ``query`` selects exactly one plain entity."""
+    if len(query._entities) != 1:
+        return None
+    mapper = getattr(query._entities[0], 'mapper', None)
+    if mapper is None or getattr(query._entities[0], 'is_aliased_class',
+                                 False):
+        return None
+    if mapper.with_polymorphic or mapper.polymorphic_on is not None:
+        return None
+    return mapper
+
+
+def _execute(query, statement, mapper=None):
+    session = query.session
+    if query._autoflush and not session._flushing:
+        session._autoflush()
+    return session.execute(statement, query._params, mapper=mapper)
+
+
+def _position(columns, column):
+    for i, c in enumerate(columns):
+        if c is column:
+            return i
+    return column
+
+
+def _eager_options(query):
+    """True if ``query`` has options eager loading a relationship."""
+    for option in query._with_options:
+        loads = getattr(option, '_to_bind', None) or \
+            list(getattr(option, 'context', {}).values()) or [option]
+        for load in loads:
+            if dict(getattr(load, 'strategy', None) or ()).get(
+                    'lazy') in _EAGER:
+                return True
+    return False
+
+
+def iterate_untracked(query):
+    """Iterate ``query`` without adding anything to the Session."""
+    mapper = _entity_mapper(query)
+    if mapper is None:
+        for row in _execute(query, query.statement):
+            yield row
+        return
+
+    if _eager_options(query):
+        raise exc.InvalidRequestError(
+            "untracked() loads column attributes only; drop the eager "
+            "loading options or use a regular Query")
+    # lazy="joined" relationships would repeat rows, and with LIMIT
+    # wrap the SELECT in a subquery
+    statement = query.enable_eagerloads(False).statement
+
+    result = _execute(query, statement, mapper)
+    # look columns up by position once, rather than by key per row;
+    # deferred columns aren't in the SELECT and are left unloaded
+    columns = list(statement.inner_columns)
+    props = []
+    for prop in mapper.column_attrs:
+        if len(prop.columns) != 1:
+            continue
+        index = _position(columns, prop.columns[0])
+        if isinstance(index, int) or result._metadata._has_key(index):
+            props.append((prop.key, index))
+    pks = [_position(columns, col) for col in mapper.primary_key]
+    class_ = mapper.class_
+    new_instance = mapper.class_manager.new_instance
+
+    # a JOIN repeats the entity once per joined row; Query returns it
+    # once, and so does this
+    seen = set()
+    for rows in partitions(result):
+        for row in rows:
+            identity = tuple([row[index] for index in pks])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            obj = new_instance()
+            state = instance_state(obj)
+            dict_ = state.dict
+            for key, index in props:
+                dict_[key] = row[index]
+            state.key = (class_, identity, None)
+            yield obj
+
+
+class UntrackedQuery(Query):
+    """Query with an untracked() method."""
+
+    _untracked = False
+
+    def untracked(self):
+        """Return a copy of this Query that loads untracked objects."""
+        q = self._clone()
+        q._untracked = True
+        return q
+
+    def __iter__(self):
+        if self._untracked:
+            return iterate_untracked(self)
+        return super(UntrackedQuery, self).__iter__()
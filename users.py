@@ -0,0 +1,65 @@
+__author__ = 'davis'
+"""
+The user / address tables from presentation-2.py and the User / Address
+classes mapped onto them, shared by the ORM benchmarks.
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy import MetaData
+from sqlalchemy import Table, Column
+from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+
+from bulk_load import load
+
+metadata = MetaData()
+
+user_table = Table('user', metadata,
+                   Column('id', Integer, primary_key=True),
+                   Column('name', String),
+                   Column('fullname', String)
+                   )
+
+address_table = Table('address', metadata,
+                      Column('id', Integer, primary_key=True),
+                      Column('email_address', String(100), nullable=False),
+                      Column('user_id', Integer, ForeignKey('user.id'))
+                      )
+
+Base = declarative_base(metadata=metadata)
+
+
+class User(Base):
+    __table__ = user_table
+
+
+class Address(Base):
+    __table__ = address_table
+
+    user = relationship("User", backref="addresses")
+
+
+def generate_users(count, start=1):
+    """Produce ``count`` user rows as dictionaries."""
+    for user_id in range(start, start + count):
+        yield {'id': user_id, 'name': 'user%d' % user_id,
+               'fullname': 'User %d' % user_id}
+
+
+def generate_addresses(count, per_user, start=1):
+    """Produce ``per_user`` address rows for each of ``count`` users."""
+    for user_id in range(start, start + count):
+        for n in range(per_user):
+            yield {'user_id': user_id,
+                   'email_address': 'u%d_%d@example.com' % (user_id, n)}
+
+
+def setup(users, addresses_per_user=0):
+    """A new in-memory SQLite engine with ``users`` users, each with
+    ``addresses_per_user`` addresses."""
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    load(engine, user_table, generate_users(users))
+    load(engine, address_table, generate_addresses(users, addresses_per_user))
+    return engine